@@ -0,0 +1,41 @@
+import io
+
+import matplotlib.patheffects as pe
+from matplotlib.figure import Figure
+
+
+def render_donut_chart(sizes, colors, legend_labels):
+    # Runs in a render worker. A standalone Figure draws with Agg and is
+    # freed with its last reference, unlike pyplot's global figure registry.
+    fig = Figure(figsize=(10, 10))
+    fig.patch.set_visible(False)
+    ax = fig.subplots()
+    ax.axis('off')
+
+    _, _, autotexts = ax.pie(
+        sizes,
+        labels=None,
+        autopct='%1.1f%%',
+        colors=colors,
+        wedgeprops=dict(width=0.3),
+        pctdistance=0.85,
+        textprops={'fontsize': 24, 'color': 'white'}
+    )
+
+    for autotext in autotexts:
+        autotext.set_path_effects([pe.withStroke(linewidth=3, foreground='black')])
+
+    ax.legend(
+        legend_labels,
+        loc="upper left",
+        bbox_to_anchor=(0, 1),
+        fontsize=14
+    )
+
+    fig.subplots_adjust(
+        left=0, bottom=0, right=1, top=1, wspace=0, hspace=0
+    )
+
+    img_bytes = io.BytesIO()
+    fig.savefig(img_bytes, format='png', transparent=True)
+    return img_bytes.getvalue()
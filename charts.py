@@ -0,0 +1,44 @@
+import asyncio
+import io
+from collections import OrderedDict
+
+import disnake
+import matplotlib.colors as mcolors
+
+from chart_render import render_donut_chart
+from render_pool import RenderQueueFull
+
+USER_COLORS = [color.replace('tab:', '') for color in mcolors.TABLEAU_COLORS]
+CHART_FILENAME = "chart.png"
+CHART_UNAVAILABLE_MESSAGE = "The chart couldn't be rendered right now. Please try again in a moment."
+
+
+class ChartUnavailable(Exception):
+    pass
+
+
+class ChartService:
+    def __init__(self, render_pool, max_entries=32):
+        self.render_pool = render_pool
+        self.max_entries = max_entries
+        self.rendered = OrderedDict()
+
+    async def donut(self, sizes, colors, legend_labels):
+        key = (tuple(sizes), tuple(colors), tuple(legend_labels))
+        if key in self.rendered:
+            self.rendered.move_to_end(key)
+            return self.rendered[key]
+
+        try:
+            png = await self.render_pool.run(render_donut_chart, list(sizes), list(colors), list(legend_labels))
+        except (RenderQueueFull, asyncio.TimeoutError) as e:
+            raise ChartUnavailable() from e
+        self.rendered[key] = png
+        if len(self.rendered) > self.max_entries:
+            self.rendered.popitem(last=False)
+        return png
+
+
+def attach_chart(embed, png):
+    embed.set_image(url=f"attachment://{CHART_FILENAME}")
+    return disnake.File(io.BytesIO(png), filename=CHART_FILENAME)
@@ -1,10 +1,10 @@
-import aiosqlite
 import disnake
 from disnake import ApplicationCommandInteraction, OptionChoice, OptionType
 from disnake.ext import commands
 import re
 from config import GUILD_IDS
-from utils import autocomp_video_names, fetch_all_hashtags, has_role_check
+from database import set_video_hashtags, split_hashtags
+from utils import autocomp_video_names, has_role_check
 
 
 def normalize_hashtags(*hashtags):
@@ -102,33 +102,34 @@ class AddHashtags(commands.Cog):
 
         normalized_hashtags = normalize_hashtags(*hashtags.values())
 
-        async with aiosqlite.connect("videos.db") as db:
-            async with db.execute("SELECT hashtags FROM videos WHERE name = ?", (name,)) as cursor:
+        async with self.bot.db.write() as db:
+            async with db.execute("SELECT id, hashtags FROM videos WHERE name = ?", (name,)) as cursor:
                 row = await cursor.fetchone()
 
-            if not row:
-                await inter.response.send_message(f"No video found with the name `{name}`.", ephemeral=True)
-                return
+            if row:
+                video_id, existing_hashtags = row[0], row[1] if row[1] else ''
+                updated_hashtags = normalize_hashtags(
+                    existing_hashtags, normalized_hashtags)
+                await db.execute("UPDATE videos SET hashtags = ? WHERE id = ?", (updated_hashtags, video_id))
+                await set_video_hashtags(db, video_id, updated_hashtags)
 
-            existing_hashtags = row[0] if row[0] else ''
-            updated_hashtags = normalize_hashtags(
-                existing_hashtags, normalized_hashtags)
-            await db.execute("UPDATE videos SET hashtags = ? WHERE name = ?", (updated_hashtags, name))
-            await db.commit()
+        if not row:
+            await inter.response.send_message(f"No video found with the name `{name}`.", ephemeral=True)
+            return
 
-            await self.bot.video_manager.update_video_info_in_cache(name, hashtags=updated_hashtags)
+        self.bot.video_manager.tag_vocabulary.add(
+            split_hashtags(updated_hashtags) - split_hashtags(existing_hashtags))
+        await self.bot.video_manager.update_video_info_in_cache(name, hashtags=updated_hashtags)
 
-            await inter.response.send_message(f"Updated hashtags for `{name}`: `{updated_hashtags}`.", ephemeral=True)
+        await inter.response.send_message(f"Updated hashtags for `{name}`: `{updated_hashtags}`.", ephemeral=True)
 
     @addhashtags.autocomplete("name")
     async def name_autocomplete(self, inter: ApplicationCommandInteraction, user_input: str):
         return await autocomp_video_names(inter, user_input)
 
     async def autocomplete_hashtag(inter: ApplicationCommandInteraction, user_input: str):
-        all_hashtags = await fetch_all_hashtags()
-        filtered_hashtags = [
-            ht for ht in all_hashtags if user_input.lower() in ht.lower()]
-        return [OptionChoice(name=ht, value=ht) for ht in filtered_hashtags][:25]
+        filtered_hashtags = inter.bot.video_manager.tag_vocabulary.search(user_input)
+        return [OptionChoice(name=ht, value=ht) for ht in filtered_hashtags]
 
     hashtag_option_names = [f"hashtag_{i}" for i in range(1, 11)]
     for option_name in hashtag_option_names:
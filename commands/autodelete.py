@@ -1,95 +1,107 @@
-import json
 import asyncio
 import datetime
+import time
+from collections import defaultdict
 from disnake.ext import commands
 import disnake
-from config import GUILD_IDS
+from config import GUILD_IDS, config_store
 from utils import has_role_check
 
+DELETE_MESSAGE_TIMER = "delete_message"
+DELETE_COALESCE_SECONDS = 5.0
+BULK_DELETE_LIMIT = 100
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)
+
+
 class AutoDelete(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.config_data = self.load_config_data()
-        self.deletion_tasks = {}
-        self.load_and_schedule_deletions()
-
-    def load_config_data(self):
-        try:
-            with open('config_data.json', 'r') as file:
-                return json.load(file)
-        except FileNotFoundError:
-            default_data = {"auto_delete": {}}
-            with open('config_data.json', 'w') as file:
-                json.dump(default_data, file, indent=4)
-            return default_data
+        self.old_deletions = asyncio.Queue()
+        self.pinned = {}
+        # Holding each deletion back a few seconds lets a busy channel's
+        # messages reach bulk delete together instead of one at a time.
+        bot.timers.register(DELETE_MESSAGE_TIMER, self.delete_due, coalesce=DELETE_COALESCE_SECONDS)
+        asyncio.create_task(self.drain_old_deletions())
+
+    @property
+    def config_data(self):
+        return config_store.data
 
     def save_config_data(self):
-        with open('config_data.json', 'w') as file:
-            json.dump(self.config_data, file, indent=4)
-
-    def load_and_schedule_deletions(self):
-        try:
-            with open('deletion_tasks.json', 'r') as file:
-                deletion_data = json.load(file)
-            for message_id, info in deletion_data.items():
-                channel_id = info['channel_id']
-                deletion_time = datetime.datetime.fromisoformat(info['deletion_time'])
-                delay = (deletion_time - datetime.datetime.utcnow()).total_seconds()
-                if delay > 0:
-                    asyncio.create_task(self.delete_message_after_delay(message_id, channel_id, delay))
-        except FileNotFoundError:
-            pass
-
-    def save_deletion_task(self, message_id, channel_id, deletion_time):
-        try:
-            with open('deletion_tasks.json', 'r') as file:
-                deletion_data = json.load(file)
-        except FileNotFoundError:
-            deletion_data = {}
-
-        deletion_data[message_id] = {
-            "channel_id": channel_id,
-            "deletion_time": deletion_time.isoformat()
-        }
-        
-        with open('deletion_tasks.json', 'w') as file:
-            json.dump(deletion_data, file, indent=4)
-
-    async def delete_message_after_delay(self, message_id, channel_id, delay):
-        await asyncio.sleep(delay)
-        channel = self.bot.get_channel(int(channel_id))
-        if channel:
-            retry_attempts = 0
-            max_retries = 3
-            while retry_attempts < max_retries:
+        config_store.mark_dirty()
+
+    async def delete_due(self, payloads):
+        by_channel = defaultdict(list)
+        for payload in payloads:
+            by_channel[payload["channel_id"]].append(payload["message_id"])
+
+        for channel_id, message_ids in by_channel.items():
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                continue
+            pinned = await self.pinned_message_ids(channel)
+            if pinned is None:
+                continue
+
+            # Discord only bulk deletes messages younger than 14 days; the
+            # rest have to go one at a time.
+            cutoff = disnake.utils.utcnow() - BULK_DELETE_MAX_AGE
+            recent = []
+            for message_id in message_ids:
+                if message_id in pinned:
+                    continue
+                if disnake.utils.snowflake_time(message_id) > cutoff:
+                    recent.append(message_id)
+                else:
+                    self.old_deletions.put_nowait((channel, message_id))
+
+            for start in range(0, len(recent), BULK_DELETE_LIMIT):
+                batch = [disnake.Object(id=message_id) for message_id in recent[start:start + BULK_DELETE_LIMIT]]
                 try:
-                    message = await channel.fetch_message(int(message_id))
-                    if not message.pinned:
-                        await message.delete()
-                    break
+                    await channel.delete_messages(batch)
                 except disnake.NotFound:
-                    break
+                    pass
                 except disnake.HTTPException as e:
-                    if e.status == 429:
-                        retry_after = e.headers.get('Retry-After')
-                        if retry_after:
-                            await asyncio.sleep(float(retry_after))
-                            retry_attempts += 1
+                    print(f"Error bulk deleting messages in channel {channel_id}: {e}")
+
+    async def pinned_message_ids(self, channel):
+        if channel.id not in self.pinned:
+            try:
+                self.pinned[channel.id] = {message.id for message in await channel.pins()}
+            except disnake.HTTPException as e:
+                print(f"Error fetching pins for channel {channel.id}: {e}")
+                return None
+        return self.pinned[channel.id]
+
+    @commands.Cog.listener()
+    async def on_guild_channel_pins_update(self, channel, last_pin):
+        self.pinned.pop(channel.id, None)
+
+    async def drain_old_deletions(self):
+        while True:
+            channel, message_id = await self.old_deletions.get()
+            await self.delete_message(channel, message_id)
+
+    async def delete_message(self, channel, message_id):
+        retry_attempts = 0
+        max_retries = 3
+        while retry_attempts < max_retries:
+            try:
+                await channel.get_partial_message(message_id).delete()
+                break
+            except disnake.NotFound:
+                break
+            except disnake.HTTPException as e:
+                if e.status == 429:
+                    retry_after = e.response.headers.get('Retry-After')
+                    if retry_after:
+                        await asyncio.sleep(float(retry_after))
+                        retry_attempts += 1
                     else:
                         break
-                finally:
-                    self.remove_deletion_task(str(message_id))
-
-    def remove_deletion_task(self, message_id):
-        try:
-            with open('deletion_tasks.json', 'r') as file:
-                deletion_data = json.load(file)
-            deletion_data.pop(message_id, None)
-            with open('deletion_tasks.json', 'w') as file:
-                json.dump(deletion_data, file, indent=4)
-        except FileNotFoundError:
-            pass
+                else:
+                    break
 
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -99,10 +111,9 @@ class AutoDelete(commands.Cog):
         channel_id = str(message.channel.id)
         if channel_id in self.config_data.get("auto_delete", {}):
             delay = self.config_data["auto_delete"][channel_id]
-            deletion_time = datetime.datetime.utcnow() + datetime.timedelta(seconds=delay)
-            task = asyncio.create_task(self.delete_message_after_delay(str(message.id), channel_id, delay))
-            self.deletion_tasks[(channel_id, str(message.id))] = task
-            self.save_deletion_task(str(message.id), channel_id, deletion_time)
+            self.bot.timers.schedule(
+                DELETE_MESSAGE_TIMER, message.id, time.time() + delay,
+                {"message_id": message.id, "channel_id": message.channel.id})
 
     @commands.slash_command(
         name='autodelete',
@@ -156,7 +167,7 @@ class AutoDelete(commands.Cog):
             "weeks": 604800
         }
         delay = value * time_converters[unit]
-        self.config_data['auto_delete'][str(channel.id)] = delay
+        self.config_data.setdefault('auto_delete', {})[str(channel.id)] = delay
         self.save_config_data()
 
         await ctx.send(f"Messages in {channel.mention} will be automatically deleted after {value} {unit}.", ephemeral=True)
@@ -1,7 +1,6 @@
 import asyncio
-import aiosqlite
 import disnake
-from utils import bot, has_role_check, normalize_url
+from utils import has_role_check, normalize_url
 from config import GUILD_IDS, MOD_LOG
 
 
@@ -65,7 +64,7 @@ def setup(bot):
 
         normalized_identifier = normalize_url(identifier)
 
-        async with aiosqlite.connect("videos.db") as db:
+        async with ctx.bot.db.read() as db:
             query = "SELECT name, original_url FROM videos WHERE name = ? OR original_url LIKE ?"
             values = (identifier, normalized_identifier)
             async with db.execute(query, values) as cursor:
@@ -80,7 +79,7 @@ def setup(bot):
             else:
                 await ctx.response.send_message("Error deleting the video. Please try again.")
         else:
-            async with aiosqlite.connect("videos.db") as db:
+            async with ctx.bot.db.read() as db:
                 query = "SELECT name, original_url FROM videos WHERE name LIKE ? OR original_url LIKE ?"
                 values = (f"%{identifier}%", f"%{identifier}%")
                 async with db.execute(query, values) as cursor:
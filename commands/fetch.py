@@ -1,13 +1,20 @@
-import aiohttp
+import asyncio
 import disnake
-import io
 import re
-from urllib.parse import quote, unquote
+from urllib.parse import quote, unquote, urlparse
+
+from media_cache import canonical_media_url
+from utils import DownloadTooLarge, stream_to_file
 
 COMMON_HEADERS = {
     "User-Agent": "Mozilla/5.0",
 }
 
+COBALT_API_URL = "https://co.wuk.sh/api/json"
+PER_HOST_LIMIT = 4
+
+host_semaphores = {}
+
 
 async def fetch_media_with_cobalt(session, url, quality="1080p", audio_only=False):
     encoded_url = quote(url, safe='')
@@ -29,10 +36,10 @@ async def fetch_media_with_cobalt(session, url, quality="1080p", audio_only=Fals
                "Content-Type": "application/json"}
 
     # # Print the request URL and body for debugging
-    # print(f"Request URL: https://co.wuk.sh/api/json")
+    # print(f"Request URL: {COBALT_API_URL}")
     # print(f"Request Body: {request_body}")
 
-    async with session.post("https://co.wuk.sh/api/json", json=request_body, headers=headers) as response:
+    async with session.post(COBALT_API_URL, json=request_body, headers=headers) as response:
         response_text = await response.text()  # Capture the response text
         if response.status == 200:
             # # Print the API response for debugging
@@ -45,19 +52,39 @@ async def fetch_media_with_cobalt(session, url, quality="1080p", audio_only=Fals
             return None
 
 
-async def download_and_send_media(ctx, media_url, caption, session, first_media):
+async def send_media(ctx, fp, filename, caption, first_media):
+    if first_media and caption:
+        message_content = f"{ctx.author.mention}: {caption}"
+    elif first_media:
+        message_content = f"{ctx.author.mention} used /fetch"
+    else:
+        message_content = None
+
+    if message_content:
+        message_content = truncate_message(message_content)
+    await ctx.channel.send(content=message_content, file=disnake.File(fp=fp, filename=filename))
+
+
+def truncate_message(message):
+    if len(message) > 2000:
+        message = message[:1997] + "..."
+    return message
+
+
+def host_semaphore(url):
+    host = urlparse(url).netloc.lower()
+    if host not in host_semaphores:
+        host_semaphores[host] = asyncio.Semaphore(PER_HOST_LIMIT)
+    return host_semaphores[host]
+
+
+async def download_media_item(media_url, session, media_cache, cache_key, item_count):
     try:
-        async with session.head(media_url, headers=COMMON_HEADERS) as head_response:
-            content_length = head_response.headers.get('Content-Length', 0)
-            if head_response.status != 200 or int(content_length) > (100 * 1024 * 1024):
-                error_message = f"Error: {media_url} is too large (>100MB) or not accessible."
-                if len(error_message) > 2000:
-                    error_message = error_message[:1997] + "..."
-                await ctx.send(error_message, ephemeral=True)
-                return
-
-        async with session.get(media_url, headers=COMMON_HEADERS) as media_response:
-            if media_response.status == 200:
+        async with host_semaphore(media_url):
+            async with session.get(media_url, headers=COMMON_HEADERS) as media_response:
+                if media_response.status != 200:
+                    return None, None, f"Failed to fetch media content for URL: {media_url}. HTTP {media_response.status}"
+
                 content_disposition = media_response.headers.get(
                     'Content-Disposition', '')
                 filename_regex = r'filename\*?=([^;]+)'
@@ -65,44 +92,102 @@ async def download_and_send_media(ctx, media_url, caption, session, first_media)
                 filename = (unquote(filename_list[0].split(
                     "'")[-1]) if filename_list else media_url.split("/")[-1].split("?")[0])
 
-                file = disnake.File(fp=io.BytesIO(await media_response.read()), filename=filename)
-
-                if first_media and caption:
-                    message_content = f"{ctx.author.mention}: {caption}"
-                elif first_media:
-                    message_content = f"{ctx.author.mention} used /fetch"
-                else:
-                    message_content = None
+                media_file = await stream_to_file(media_response)
 
-                if message_content and len(message_content) > 2000:
-                    message_content = message_content[:1997] + "..."
-                await ctx.channel.send(content=message_content, file=file)
-            else:
-                await ctx.send(f"Failed to fetch media content for URL: {media_url}. HTTP {media_response.status}", ephemeral=True)
+        await media_cache.put_stream(cache_key, media_file, filename=filename, item_count=item_count)
+        return media_file, filename, None
+    except DownloadTooLarge:
+        return None, None, f"Error: {media_url} is too large (>100MB) or not accessible."
     except Exception as e:
-        error_message = f"Error processing {media_url}: {str(e)}"
-        if len(error_message) > 2000:
-            error_message = error_message[:1997] + "..."
-        await ctx.send(error_message, ephemeral=True)
+        return None, None, f"Error processing {media_url}: {str(e)}"
+
+
+def cached_item_keys(media_cache, canonical_url, quality, audio_only):
+    first_key = media_cache.key("fetch", canonical_url, quality, audio_only, 0)
+    metadata = media_cache.metadata(first_key)
+    if not metadata:
+        return None
+    keys = [media_cache.key("fetch", canonical_url, quality, audio_only, index)
+            for index in range(metadata.get('item_count', 1))]
+    if all(media_cache.metadata(key) for key in keys):
+        return keys
+    return None
+
+
+def open_cached_items(media_cache, cached_keys):
+    items = []
+    for key in cached_keys:
+        cached = media_cache.open(key)
+        if cached is None:
+            for media_file, _, _ in items:
+                media_file.close()
+            return None
+        items.append((cached, media_cache.metadata(key)['filename'], None))
+    return items
 
 
-async def process_urls(ctx, urls, caption, session, first_media, quality="1080p", audio_only=False):
-    for url in urls:
+async def resolve_url(url, session, media_cache, quality, audio_only):
+    canonical_url = canonical_media_url(url)
+    cached_keys = cached_item_keys(media_cache, canonical_url, quality, audio_only)
+    if cached_keys:
+        cached_items = open_cached_items(media_cache, cached_keys)
+        if cached_items:
+            return cached_items
+
+    async with host_semaphore(COBALT_API_URL):
         result = await fetch_media_with_cobalt(session, url, quality, audio_only)
-        if result:
-            status = result.get('status')
-            if status in ['picker', 'success', 'stream', 'redirect']:
-                media_items = result.get(
-                    'picker', []) if status == 'picker' else [result]
-                for item in media_items:
-                    media_url = item.get('url')
-                    if media_url:
-                        await download_and_send_media(ctx, media_url, caption if first_media else None, session, first_media)
-                        first_media = False
-            else:
-                await ctx.send(f"Failed to process URL: {url}.", ephemeral=True)
-        else:
-            await ctx.send(f"Failed to fetch media for URL: {url}."+"\nCheck API status: https://status.cobalt.tools/", ephemeral=True)
+    if not result:
+        return [(None, None, f"Failed to fetch media for URL: {url}."+"\nCheck API status: https://status.cobalt.tools/")]
+
+    status = result.get('status')
+    if status not in ['picker', 'success', 'stream', 'redirect']:
+        return [(None, None, f"Failed to process URL: {url}.")]
+
+    media_items = result.get(
+        'picker', []) if status == 'picker' else [result]
+    downloads = [
+        download_media_item(
+            item['url'], session, media_cache,
+            media_cache.key("fetch", canonical_url, quality, audio_only, index), len(media_items))
+        for index, item in enumerate(media_items) if item.get('url')
+    ]
+    return await asyncio.gather(*downloads)
+
+
+def close_resolved(task):
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled() and task.exception() is None:
+        for media_file, _, _ in task.result():
+            if media_file is not None and not media_file.closed:
+                media_file.close()
+
+
+async def process_urls(ctx, urls, caption, session, first_media, quality="1080p", audio_only=False):
+    # Lookups and downloads for every URL run at once, limited per host, but
+    # the results are posted in the order the URLs were given.
+    tasks = [
+        asyncio.create_task(resolve_url(url, session, ctx.bot.media_cache, quality, audio_only))
+        for url in urls
+    ]
+
+    try:
+        for url, task in zip(urls, tasks):
+            try:
+                items = await task
+            except Exception as e:
+                items = [(None, None, f"Error processing {url}: {str(e)}")]
+
+            for media_file, filename, error_message in items:
+                if media_file is None:
+                    await ctx.send(truncate_message(error_message), ephemeral=True)
+                    continue
+
+                await send_media(ctx, media_file, filename, caption if first_media else None, first_media)
+                first_media = False
+    finally:
+        for task in tasks:
+            close_resolved(task)
     return first_media
 
 
@@ -131,6 +216,5 @@ def setup(bot):
         await ctx.send("Processing your request...", ephemeral=True)
         all_urls = [url] + [value for key, value in urls.items() if value]
 
-        async with aiohttp.ClientSession() as session:
-            first_media = True
-            first_media = await process_urls(ctx, all_urls, caption, session, first_media, quality, audio_only)
+        first_media = True
+        first_media = await process_urls(ctx, all_urls, caption, ctx.bot.http_session, first_media, quality, audio_only)
@@ -1,5 +1,5 @@
 import disnake
-from utils import bot, normalize_url
+from utils import normalize_url
 from config import GUILD_IDS, MOD_LOG
 
 
@@ -2,7 +2,6 @@ import math
 import re
 import disnake
 from disnake.ext import commands
-from utils import fetch_all_hashtags
 from config import GUILD_IDS
 import uuid
 
@@ -21,7 +20,7 @@ class ListHashtags(commands.Cog):
         guild_ids=GUILD_IDS
     )
     async def list_hashtags(self, inter: disnake.ApplicationCommandInteraction):
-        hashtags = await fetch_all_hashtags()
+        hashtags = self.bot.video_manager.tag_vocabulary.tags()
         hashtags_sorted = sorted(hashtags, key=natural_sort_key)
         if hashtags_sorted:
             embed, total_pages = await self.create_hashtags_embed(hashtags_sorted, 1)
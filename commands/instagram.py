@@ -1,78 +1,65 @@
 import asyncio
 import disnake
 import re
-import io
 from private_config import RAPID_API_KEY
 
 import aiohttp
 import asyncio
-import io
 import re
 import json
 from private_config import RAPID_API_KEY
-from utils import insta_fetch_media, insta_fetch_media_fallback, extract_urls
+from media_cache import canonical_media_url
+from utils import download_media, insta_fetch_media, extract_urls
 
 re_instagram_post = re.compile(r'/p/([^/?]+)')
 re_instagram_reel = re.compile(r'/reel/([^/?]+)')
 
 
-async def process_urls(ctx, urls, caption, session):
-    primary_tasks = []
-    fallback_tasks = []
-    content_counter = 1
-
+async def process_urls(ctx, urls, caption, session, media_cache):
+    valid_urls = []
     for url in urls:
-        match = re_instagram_post.search(url) or re_instagram_reel.search(url)
-        if match:
-            shortcode = match.group(1)
-            primary_tasks.append(asyncio.create_task(
-                insta_fetch_media(session, url)))
+        if re_instagram_post.search(url) or re_instagram_reel.search(url):
+            valid_urls.append(url)
         else:
             await ctx.send(f"Invalid Instagram URL: {url}", ephemeral=True)
-            continue
 
-    primary_results = await asyncio.gather(*primary_tasks, return_exceptions=True)
+    cache_keys = [media_cache.key("video", canonical_media_url(url)) for url in valid_urls]
+    cached_files = [media_cache.open(key) for key in cache_keys]
+    pending_urls = [url for url, cached in zip(valid_urls, cached_files) if cached is None]
 
-    for url, result in zip(urls, primary_results):
-        if isinstance(result, Exception) or result is None or result.get('media_content') is None:
-            fallback_tasks.append(asyncio.create_task(
-                insta_fetch_media_fallback(session, url, "video", content_counter)))
-            content_counter += 1
+    content_counter = 1
 
-    fallback_results = await asyncio.gather(*fallback_tasks, return_exceptions=True) if fallback_tasks else []
-
-    combined_results = []
-    fallback_index = 0
-    for result in primary_results:
-        if isinstance(result, Exception) or result is None or result.get('media_content') is None:
-            combined_results.append(fallback_results[fallback_index])
-            fallback_index += 1
-        else:
-            combined_results.append(result)
+    resolve_tasks = [asyncio.create_task(insta_fetch_media(session, url)) for url in pending_urls]
+    resolved_results = await asyncio.gather(*resolve_tasks, return_exceptions=True)
 
+    fetched_results = iter(resolved_results)
     first_message = True
-    for result in combined_results:
-        if result and result.get('media_content'):
-            media_url = result['media_content']
-            async with session.get(media_url) as media_response:
-                if media_response.status == 200:
-                    media_content = await media_response.read()
-                    file_extension = result.get('file_extension', 'mp4')
-                    filename = f"media_{content_counter}.{file_extension}"
+    for url, cache_key, cached in zip(valid_urls, cache_keys, cached_files):
+        if cached is not None:
+            media_file = cached
+            file_extension = media_cache.metadata(cache_key).get('file_extension', 'mp4')
+        else:
+            result = next(fetched_results)
+            if isinstance(result, Exception) or not result or not result.get('media_content'):
+                print(f"Failed to process URL: {url}")
+                continue
+            file_extension = result.get('file_extension', 'mp4')
+            media_file = await download_media(
+                result['media_content'], session, media_cache, cache_key, file_extension=file_extension)
+            if media_file is None:
+                continue
 
-                    if first_message:
-                        message_content = f"{ctx.author.mention}: {caption}" if caption else f"{ctx.author.mention} used /insta"
-                        first_message = False
-                    else:
-                        message_content = None
+        filename = f"media_{content_counter}.{file_extension}"
 
-                    file = disnake.File(fp=io.BytesIO(
-                        media_content), filename=filename)
-                    await ctx.channel.send(content=message_content, file=file)
-                    content_counter += 1
+        if first_message:
+            message_content = f"{ctx.author.mention}: {caption}" if caption else f"{ctx.author.mention} used /insta"
+            first_message = False
         else:
-            print(
-                f"Failed to process URL: {result.get('original_link', 'Unknown URL')}")
+            message_content = None
+
+        file = disnake.File(fp=media_file, filename=filename)
+        await ctx.channel.send(content=message_content, file=file)
+        content_counter += 1
 
 
 def setup(bot):
@@ -107,4 +94,4 @@ def setup(bot):
         caption = inputs.get("caption")
         urls = [url for url in urls if url is not None]
 
-        await process_urls(ctx, urls, caption, bot.http_session)
+        await process_urls(ctx, urls, caption, bot.http_session, bot.media_cache)
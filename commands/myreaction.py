@@ -1,5 +1,4 @@
 import time
-from utils import bot
 from config import GUILD_IDS
 from disnake.ext import commands
 from disnake import Option, OptionType
@@ -31,21 +30,20 @@ def setup(bot):
         colour = colour.lower() if colour else None
         color_choices = ["green", "red"] if colour is None else [colour]
 
-        available_videos = await bot.video_manager.get_available_videos_with_cooldown(
+        chosen_video = await bot.video_manager.pick_available_video(
             color_choices, current_time, bot.cooldown
         )
 
-        if not available_videos:
+        if not chosen_video:
             await ctx.followup.send(
                 "No available videos for the chosen color or all are under cooldown. "
             )
             return
 
-        chosen_video = available_videos[0]
-        bot.video_manager.played_videos[chosen_video] = current_time
+        bot.video_manager.record_play(chosen_video, current_time)
 
         formatted_video_url = format_video_url_with_emoji(
             ctx.guild, chosen_video)
 
         await ctx.edit_original_message(content=formatted_video_url)
-        bot.video_manager.save_data()
+
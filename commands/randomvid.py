@@ -2,7 +2,7 @@ import asyncio
 import re
 import disnake
 import time
-from utils import bot, has_role_check, format_video_url_with_emoji
+from utils import has_role_check, format_video_url_with_emoji
 from config import MOD_LOG
 import re
 
@@ -85,11 +85,10 @@ class VideoActionsView(disnake.ui.View):
         await interaction.response.edit_message(view=self)
 
         current_time = time.time()
-        available_videos = await self.bot.video_manager.get_available_videos_with_cooldown(
+        new_video_url = await self.bot.video_manager.pick_available_video(
             self.selected_colors, current_time, self.bot.cooldown)
-        if available_videos:
-            new_video_url = available_videos[0]
-            self.bot.video_manager.played_videos[new_video_url] = current_time
+        if new_video_url:
+            self.bot.video_manager.record_play(new_video_url, current_time)
             display_video_url = format_video_url_with_emoji(
                 self.ctx.guild, new_video_url)
             view = VideoActionsView(
@@ -105,8 +104,6 @@ class VideoActionsView(disnake.ui.View):
 
             asyncio.create_task(self.disable_buttons_after_delay(
                 self.bot, self.ctx, new_message.id, view.timeout))
-
-            self.bot.video_manager.save_data()
         else:
             button.disabled = True
             await interaction.followup.send("No available videos to re-roll.", ephemeral=True)
@@ -223,15 +220,14 @@ def setup(bot):
         else:
             colours = [colour]
 
-        available_videos = await bot.video_manager.get_available_videos_with_cooldown(
+        chosen_video = await bot.video_manager.pick_available_video(
             colours, current_time, bot.cooldown)
 
-        if not available_videos:
+        if not chosen_video:
             await ctx.followup.send("No videos found that meet the cooldown requirement.")
             return
 
-        chosen_video = available_videos[0]
-        bot.video_manager.played_videos[chosen_video] = current_time
+        bot.video_manager.record_play(chosen_video, current_time)
 
         display_video_url = format_video_url_with_emoji(
             ctx.guild, chosen_video)
@@ -242,5 +238,3 @@ def setup(bot):
 
         asyncio.create_task(view.disable_buttons_after_delay(
             bot, ctx, message.id, view.timeout))
-
-        bot.video_manager.save_data()
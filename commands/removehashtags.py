@@ -1,10 +1,10 @@
-import aiosqlite
 import disnake
 from disnake import ApplicationCommandInteraction, OptionChoice, OptionType
 from disnake.ext import commands
 import re
 from config import GUILD_IDS
-from utils import autocomp_video_names, fetch_all_hashtags, has_role_check
+from database import set_video_hashtags
+from utils import autocomp_video_names, has_role_check
 
 
 def normalize_hashtags(*hashtags):
@@ -113,39 +113,39 @@ class RemoveHashtags(commands.Cog):
         hashtags_to_remove = [
             hashtag for hashtag in kwargs.values() if hashtag]
 
-        async with aiosqlite.connect("videos.db") as db:
-            async with db.execute("SELECT hashtags FROM videos WHERE name = ?", (name,)) as cursor:
+        async with self.bot.db.write() as db:
+            async with db.execute("SELECT id, hashtags FROM videos WHERE name = ?", (name,)) as cursor:
                 row = await cursor.fetchone()
 
-            if not row:
-                await inter.response.send_message(f"No video found with the name `{name}`.", ephemeral=True)
-                return
+            if row:
+                video_id, existing_hashtags = row[0], row[1] if row[1] else ''
+                updated_hashtags, hashtags_actually_removed = remove_specific_hashtags(
+                    existing_hashtags, *hashtags_to_remove)
+                await db.execute("UPDATE videos SET hashtags = ? WHERE id = ?", (updated_hashtags, video_id))
+                await set_video_hashtags(db, video_id, updated_hashtags)
 
-            existing_hashtags = row[0] if row[0] else ''
-            updated_hashtags, hashtags_actually_removed = remove_specific_hashtags(
-                existing_hashtags, *hashtags_to_remove)
-            await db.execute("UPDATE videos SET hashtags = ? WHERE name = ?", (updated_hashtags, name))
-            await db.commit()
+        if not row:
+            await inter.response.send_message(f"No video found with the name `{name}`.", ephemeral=True)
+            return
 
-            await self.bot.video_manager.update_video_hashtags_in_cache(name, updated_hashtags)
+        self.bot.video_manager.tag_vocabulary.remove(hashtags_actually_removed)
+        await self.bot.video_manager.update_video_hashtags_in_cache(name, updated_hashtags)
 
-            removed_hashtags_str = ', '.join(
-                [f"#{ht}" for ht in hashtags_actually_removed])
-            hashtag_or_hashtags = "hashtag" if len(
-                hashtags_actually_removed) == 1 else "hashtags"
-            new_hashtags_message = "No hashtags assigned anymore." if not updated_hashtags else f"New hashtags: `{updated_hashtags}`."
-            message = f"Removed {hashtag_or_hashtags} `{removed_hashtags_str}` from `{name}`. {new_hashtags_message}"
-            await inter.response.send_message(message, ephemeral=True)
+        removed_hashtags_str = ', '.join(
+            [f"#{ht}" for ht in hashtags_actually_removed])
+        hashtag_or_hashtags = "hashtag" if len(
+            hashtags_actually_removed) == 1 else "hashtags"
+        new_hashtags_message = "No hashtags assigned anymore." if not updated_hashtags else f"New hashtags: `{updated_hashtags}`."
+        message = f"Removed {hashtag_or_hashtags} `{removed_hashtags_str}` from `{name}`. {new_hashtags_message}"
+        await inter.response.send_message(message, ephemeral=True)
 
     @removehashtags.autocomplete("name")
     async def name_autocomplete(self, inter: ApplicationCommandInteraction, user_input: str):
         return await autocomp_video_names(inter, user_input)
 
     async def autocomplete_hashtag(inter: ApplicationCommandInteraction, user_input: str):
-        all_hashtags = await fetch_all_hashtags()
-        filtered_hashtags = [
-            ht for ht in all_hashtags if user_input.lower() in ht.lower()]
-        return [OptionChoice(name=ht, value=ht) for ht in filtered_hashtags][:25]
+        filtered_hashtags = inter.bot.video_manager.tag_vocabulary.search(user_input)
+        return [OptionChoice(name=ht, value=ht) for ht in filtered_hashtags]
 
     hashtag_option_names = [f"hashtag_{i}" for i in range(1, 11)]
     for option_name in hashtag_option_names:
@@ -312,7 +312,7 @@ class RemoveHashtags(commands.Cog):
             return []
 
     async def fetch_hashtags_for_video(self, video_name: str):
-        async with aiosqlite.connect("videos.db") as db:
+        async with self.bot.db.read() as db:
             async with db.execute("SELECT hashtags FROM videos WHERE name = ?", (video_name,)) as cursor:
                 row = await cursor.fetchone()
                 if row:
@@ -1,9 +1,7 @@
-import asyncio
 import time
-import disnake
 from config import ALLOWED_USER_ID, GREEN_ROLE_ID, GUILD_IDS, RED_ROLE_ID, YELLOW_ROLE_ID
 from database import fisher_yates_shuffle
-from utils import bot, load_setup_data, store_setup_data, load_role_timestamps, setup_data
+from utils import load_setup_data, store_setup_data, setup_data
 
 
 async def send_message_and_add_reaction(channel, message):
@@ -70,11 +68,49 @@ reaction_message_ids = {}
 ALLOWED_EMOJIS = {"✅", "❌", "🤔"}
 
 
+def is_watched_message(guild_id, message_id):
+    # The setup message is read from the config store each time so edits to
+    # the config file are picked up; follow-up prompts are tracked in memory.
+    if message_id in reaction_message_ids.get(guild_id, ()):
+        return True
+    return message_id == load_setup_data(guild_id)[0]
+
+
 def setup(bot):
+    @bot.listen("on_ready")
+    async def build_role_index():
+        for guild in bot.guilds:
+            bot.role_index.rebuild(guild)
+
+    @bot.listen("on_member_join")
+    async def index_joined_member(member):
+        bot.role_index.add_member(member)
+
+    @bot.listen("on_member_remove")
+    async def unindex_removed_member(member):
+        bot.role_index.remove_member(member)
+
+    @bot.listen("on_member_update")
+    async def reindex_member_roles(before, after):
+        bot.role_index.update_member(before, after)
+
     @bot.event
     async def on_raw_reaction_add(payload):
-        user = await bot.fetch_user(payload.user_id)
-        if user.bot:
+        # Every reaction in the guild lands here, so anything that is not on
+        # a watched message is rejected before touching the network.
+        if payload.guild_id is None or not is_watched_message(payload.guild_id, payload.message_id):
+            return
+
+        emoji = str(payload.emoji)
+        if emoji not in ALLOWED_EMOJIS:
+            return
+
+        guild = bot.get_guild(payload.guild_id)
+        if guild is None:
+            return
+
+        user = payload.member or guild.get_member(payload.user_id)
+        if user is None or user.bot:
             return
 
         assert bot.video_manager is not None, "video_manager is not initialized"
@@ -82,30 +118,17 @@ def setup(bot):
         setup_data["message_id"], setup_data["channel_id"], setup_data["target_channel_id"] = load_setup_data(
             payload.guild_id)
 
-        if payload.message_id != setup_data["message_id"] or payload.channel_id != setup_data["channel_id"]:
-            if payload.message_id not in reaction_message_ids.get(payload.guild_id, []):
-                return
-
         target_channel = bot.get_channel(setup_data["target_channel_id"])
         if target_channel is None:
             return
 
-        guild = bot.get_guild(payload.guild_id)
-        if guild is None:
-            return
-
         all_guild_emojis = list(guild.emojis)
         fisher_yates_shuffle(all_guild_emojis)
-
-        emoji = str(payload.emoji)
         random_emojis = all_guild_emojis[:4]
 
-        yellow_role = disnake.utils.get(guild.roles, id=YELLOW_ROLE_ID)
-        green_role = disnake.utils.get(guild.roles, id=GREEN_ROLE_ID)
-        red_role = disnake.utils.get(guild.roles, id=RED_ROLE_ID)
-
-        if emoji not in ALLOWED_EMOJIS:
-            return
+        yellow_role = guild.get_role(YELLOW_ROLE_ID)
+        green_role = guild.get_role(GREEN_ROLE_ID)
+        red_role = guild.get_role(RED_ROLE_ID)
 
         color = None
         if emoji == "✅":
@@ -115,33 +138,15 @@ def setup(bot):
         elif emoji == "🤔":
             color = "yellow"
 
-        yellow_role_users = []
-        if color == "green" and yellow_role:
-            for member in guild.members:
-                if yellow_role in member.roles:
-                    yellow_role_users.append(member)
-
-        played_videos = bot.video_manager.played_videos
         current_time = time.time()
 
-        available_videos = await bot.video_manager.get_available_videos_with_cooldown([color], current_time, bot.cooldown)
-
-        if not available_videos:
-            await target_channel.send(f"No {color} videos found in the database that meet the cooldown requirement.")
-            return
-
-        chosen_video = available_videos[0]
+        chosen_video = await bot.video_manager.pick_available_video([color], current_time, bot.cooldown)
 
         if not chosen_video:
-            await target_channel.send("No videos found that meet the cooldown requirement.")
+            await target_channel.send(f"No {color} videos found in the database that meet the cooldown requirement.")
             return
 
-        played_videos[chosen_video] = current_time
-        bot.video_manager.save_data()
-
-        await asyncio.sleep(0)
-        yellow_role_users = [
-            member for member in guild.members if yellow_role in member.roles]
+        bot.video_manager.record_play(chosen_video, current_time)
 
         emoji_to_color_and_message = {
             "✅": (f"{user.mention} is {green_role.mention} {random_emojis[1]}"),
@@ -152,14 +157,12 @@ def setup(bot):
         user_message = emoji_to_color_and_message[emoji]
 
         if color == "green":
-            yellow_role_users = [
-                member for member in guild.members if yellow_role in member.roles and member.id != user.id]
+            yellow_role_users = bot.role_index.holders(guild.id, YELLOW_ROLE_ID) - {user.id}
 
             if yellow_role_users:
                 user_message += f"\nDoes that change your mind {yellow_role.mention} {random_emojis[0]}❓[⠀]({chosen_video}) "
                 message_in_target_channel_id = await send_message_and_add_reaction(target_channel, user_message)
-                reaction_message_ids.setdefault(payload.guild_id, []).append(
-                    message_in_target_channel_id)
+                reaction_message_ids.setdefault(payload.guild_id, set()).add(message_in_target_channel_id)
             else:
                 user_message += f"[⠀]({chosen_video})"
                 await target_channel.send(user_message)
@@ -1,11 +1,9 @@
-import json
 import disnake
 import time
-import matplotlib.pyplot as plt
-import io
-import matplotlib.patheffects as pe
+from charts import CHART_UNAVAILABLE_MESSAGE, ChartUnavailable, attach_chart
 from config import GUILD_IDS, get_cooldown
-from utils import bot
+
+COOLDOWN_CHART_COLORS = ['#A40000', '#4E9A06']
 
 def format_cooldown(cooldown_value):
     days, remainder = divmod(cooldown_value, 86400)
@@ -38,6 +36,19 @@ def format_cooldown_for_title(cooldown_value):
     else:
         return f"{seconds}s"
 
+def count_on_cooldown(bot, cooldown_value):
+    return bot.video_manager.cooldown_occupancy(time.time(), cooldown_value)
+
+async def render_cooldown_chart(bot, cooldown_value):
+    on_cooldown, total_videos = count_on_cooldown(bot, cooldown_value)
+    sizes = [on_cooldown, total_videos - on_cooldown]
+    color_labels = ['On Cooldown', 'Available']
+    return await bot.charts.donut(
+        sizes,
+        COOLDOWN_CHART_COLORS,
+        [f"{label} {size}" for label, size in zip(color_labels, sizes)]
+    )
+
 def setup(bot):
     @bot.slash_command(
         name="showcooldown",
@@ -49,69 +60,14 @@ def setup(bot):
         cooldown_value = get_cooldown()
         cooldown_for_title = format_cooldown_for_title(cooldown_value)
 
-        current_time = time.time()
-        on_cooldown = 0
-
-        with open('video_data.json', 'r') as file:
-            video_data = json.load(file)
-
-        all_videos = {video for color_list in video_data['video_lists'].values() for video in color_list}
-        total_videos = len(all_videos)
-
-        for video in all_videos:
-            last_played = video_data['played_videos'].get(video)
-            if last_played and (current_time - last_played < cooldown_value):
-                on_cooldown += 1
-
-        available_videos = total_videos - on_cooldown
-
-        fig, ax = plt.subplots(figsize=(10, 10))
-        fig.patch.set_visible(False)
-        ax.axis('off')
-
-        color_labels = ['On Cooldown', 'Available']
-        sizes = [on_cooldown, available_videos]
-        colors = ['#A40000', '#4E9A06']
-
-        wedges, texts, autotexts = plt.pie(
-            sizes,
-            labels=None,
-            autopct='%1.1f%%',
-            colors=colors,
-            wedgeprops=dict(width=0.3),
-            pctdistance=0.85,
-            textprops={'fontsize': 24, 'color': 'white'}
-        )
-
-        plt.setp(
-            autotexts,
-            path_effects=[pe.withStroke(linewidth=3, foreground='black')]
-        )
-
-        plt.legend(
-            [f"{label} {size}" for label, size in zip(color_labels, sizes)],
-            loc="upper left",
-            bbox_to_anchor=(0, 1),
-            fontsize=14
-        )
-
-        plt.subplots_adjust(
-            left=0, bottom=0, right=1, top=1, wspace=0, hspace=0
-        )
-
-        img_bytes = io.BytesIO()
-        plt.savefig(img_bytes, format='png', transparent=True)
-        img_bytes.seek(0)
-
-        async with bot.http_session.post('https://0x0.st', data={'file': img_bytes}) as resp:
-            if resp.status != 200:
-                await ctx.send('Could not upload the image.')
-                return
-            else:
-                img_url = await resp.text()
+        try:
+            png = await render_cooldown_chart(bot, cooldown_value)
+        except ChartUnavailable:
+            await ctx.edit_original_message(content=CHART_UNAVAILABLE_MESSAGE)
+            return
 
         embed_title = f"Current Cooldown: {cooldown_for_title}"
         embed = disnake.Embed(title=embed_title, color=disnake.Color.blue())
-        embed.set_image(url=img_url)
+        file = attach_chart(embed, png)
 
-        await ctx.edit_original_message(embed=embed)
\ No newline at end of file
+        await ctx.edit_original_message(embed=embed, file=file)
\ No newline at end of file
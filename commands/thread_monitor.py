@@ -1,8 +1,7 @@
-import json
 import asyncio
 import disnake
 from disnake.ext import commands
-from config import GUILD_IDS
+from config import GUILD_IDS, config_store
 from utils import has_role_check
 
 
@@ -12,28 +11,10 @@ class ThreadMonitor(commands.Cog):
         self.target_channel_ids = self.load_target_channels()
 
     def load_target_channels(self):
-        config_data = self.get_config_data()
-        return config_data.get('target_channels', [])
+        return list(config_store.get('target_channels', []))
 
     def save_target_channels(self):
-        config_data = self.get_config_data()
-        config_data['target_channels'] = self.target_channel_ids
-        self.update_config_data(config_data)
-
-    def get_config_data(self):
-        try:
-            with open('config_data.json', 'r') as file:
-                return json.load(file)
-        except FileNotFoundError:
-            print("config_data.json not found. Returning empty config.")
-            return {}
-
-    def update_config_data(self, config_data):
-        try:
-            with open('config_data.json', 'w') as file:
-                json.dump(config_data, file, indent=4)
-        except Exception as e:
-            print(f"Error saving to config_data.json: {e}")
+        config_store.set('target_channels', list(self.target_channel_ids))
 
     async def format_message(self, message):
         content = message.content or ''
@@ -1,11 +1,11 @@
-import os
-import aiofiles
 import disnake
-import io
-import re
 import asyncio
+from config import SLIDESHOW_ENCODER
+from media_cache import canonical_media_url
 from utils import download_media, fetch_tiktok_content, process_slideshow, resolve_short_url, extract_urls
 
+MAX_CONCURRENT_URLS = 4
+
 
 def setup(bot):
     @bot.slash_command(
@@ -61,60 +61,79 @@ def setup(bot):
 
         urls = {'url1': url1, **urls}
 
-        for url_key in sorted(urls.keys()):
-            original_text = urls[url_key]
-            if not original_text:
-                continue
+        # Resolve and download every link at once, but post in input order.
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_URLS)
+        tasks = [
+            asyncio.create_task(prepare_media(ctx, url_key, urls[url_key], slideshow_length, semaphore))
+            for url_key in sorted(urls.keys()) if urls[url_key]
+        ]
 
-            extracted_urls = extract_urls(original_text)
-            if not extracted_urls:
-                await ctx.send(f"No valid URL found in {url_key}.", ephemeral=True)
-                continue
-            original_url = extracted_urls[0]
+        try:
+            for task in tasks:
+                try:
+                    media_file, filename, error_message = await task
+                except Exception as e:
+                    print(f"Error processing TikTok URL: {e}")
+                    media_file, filename, error_message = None, None, "Failed to process the TikTok URL."
+
+                if media_file:
+                    await send_file(ctx, media_file, filename, caption, first_message)
+                    first_message = False
+                elif error_message:
+                    await ctx.send(error_message, ephemeral=True)
+        finally:
+            for task in tasks:
+                discard_prepared(task)
 
+    async def prepare_media(ctx, url_key, original_text, slideshow_length, semaphore):
+        extracted_urls = extract_urls(original_text)
+        if not extracted_urls:
+            return None, None, f"No valid URL found in {url_key}."
+        original_url = extracted_urls[0]
+
+        async with semaphore:
+            media_cache = ctx.bot.media_cache
             resolved_url = await resolve_short_url(original_url, ctx.bot.http_session) if original_url.startswith("https://vm.tiktok.com/") else original_url
+
+            canonical_url = canonical_media_url(resolved_url)
+            video_key = media_cache.key("video", canonical_url)
+            slideshow_key = media_cache.key("slideshow", canonical_url, slideshow_length, SLIDESHOW_ENCODER)
+            cached = media_cache.open(video_key) or media_cache.open(slideshow_key)
+            if cached is not None:
+                filename = "TikTokVideo.mp4" if media_cache.metadata(video_key) else "TikTokSlideshow.mp4"
+                return cached, filename, None
+
             tiktok_response = await fetch_tiktok_content(resolved_url, ctx.bot.http_session)
 
-            if isinstance(tiktok_response, dict):
-                if tiktok_response['type'] == 'video':
-                    video_url = tiktok_response['video_url']
-                    await send_video(ctx, video_url, caption, first_message)
-                    first_message = False
-                elif tiktok_response['type'] == 'slideshow':
-                    slideshow_urls = tiktok_response['images']
-                    audio_url = tiktok_response['music']
-                    await send_slideshow(ctx, slideshow_urls, audio_url, slideshow_length, caption, first_message)
-                    first_message = False
-                else:
-                    await ctx.send("Received unexpected response type.", ephemeral=True)
-            else:
-                await ctx.send("Failed to process the TikTok URL.", ephemeral=True)
-
-    async def send_video(ctx, video_url, caption, first_message):
-        video_data = await download_media(video_url, ctx.bot.http_session)
-        if video_data:
-            file_name = "TikTokVideo.mp4"
-            if first_message:
-                message_content = f"{ctx.author.mention}: {caption}" if caption else f"{ctx.author.mention} used /tiktok"
-            else:
-                message_content = None
-            file = disnake.File(fp=video_data, filename=file_name)
-            await ctx.channel.send(content=message_content, file=file)
-        else:
-            await ctx.send("Failed to download the video.", ephemeral=True)
+            if not isinstance(tiktok_response, dict):
+                return None, None, "Failed to process the TikTok URL."
 
-    async def send_slideshow(ctx, slideshow_urls, audio_url, slideshow_length, caption, first_message):
-        video_file, error_message = await process_slideshow(slideshow_urls, audio_url, ctx.bot.http_session, slideshow_length)
-        if video_file:
-            if first_message:
-                message_content = f"{ctx.author.mention}: {caption}" if caption else f"{ctx.author.mention} used /tiktok"
+            if tiktok_response.get('type') == 'video':
+                video_data = await download_media(
+                    tiktok_response['video_url'], ctx.bot.http_session, media_cache, video_key)
+                if video_data:
+                    return video_data, "TikTokVideo.mp4", None
+                return None, None, "Failed to download the video."
+            elif tiktok_response.get('type') == 'slideshow':
+                video_file, error_message = await process_slideshow(
+                    tiktok_response['images'], tiktok_response['music'], ctx.bot.http_session,
+                    ctx.bot.render_pool, slideshow_length, cache=media_cache, cache_key=slideshow_key)
+                return video_file, "TikTokSlideshow.mp4", error_message
             else:
-                message_content = None
-            async with aiofiles.open(video_file, 'rb') as f:
-                file_content = await f.read()
-            file = disnake.File(fp=io.BytesIO(file_content),
-                                filename=os.path.basename(video_file))
-            await ctx.channel.send(content=message_content, file=file)
-            await asyncio.to_thread(os.remove, video_file)
-        elif error_message:
-            await ctx.send(error_message, ephemeral=True)
+                return None, None, "Received unexpected response type."
+
+    def discard_prepared(task):
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled() and task.exception() is None:
+            media_file = task.result()[0]
+            if media_file is not None and not media_file.closed:
+                media_file.close()
+
+    async def send_file(ctx, fp, filename, caption, first_message):
+        if first_message:
+            message_content = f"{ctx.author.mention}: {caption}" if caption else f"{ctx.author.mention} used /tiktok"
+        else:
+            message_content = None
+        file = disnake.File(fp=fp, filename=filename)
+        await ctx.channel.send(content=message_content, file=file)
@@ -2,7 +2,6 @@ import disnake
 from config import GUILD_IDS
 from datetime import datetime, timedelta
 import pytz
-from utils import bot
 
 def setup(bot):
     @bot.slash_command(
@@ -1,9 +1,5 @@
-import aiosqlite
 import disnake
-import matplotlib.pyplot as plt
-import io
-import matplotlib.patheffects as pe
-from utils import bot
+from charts import CHART_UNAVAILABLE_MESSAGE, ChartUnavailable, attach_chart
 from config import GUILD_IDS
 
 def setup(bot):
@@ -13,69 +9,32 @@ def setup(bot):
         guild_ids=GUILD_IDS
     )
     async def totalvids(ctx):
-        embed = await create_total_videos_embed()
-        await ctx.response.send_message(embed=embed)
-
-    async def create_total_videos_embed():
-        db = await aiosqlite.connect("videos.db")
+        await ctx.response.defer()
         try:
-            color_labels = ["green", "red", "yellow"]
-            pastel_colors = ['#4E9A06', '#A40000', '#FDBF11']
-            color_counts = {}
-            for color in color_labels:
-                query = "SELECT COUNT(*) FROM videos WHERE LOWER(color) = ?"
-                values = (color,)
-                async with db.execute(query, values) as cursor:
-                    color_counts[color] = (await cursor.fetchone())[0]
-
-            total_videos = sum(color_counts.values())
-
-            fig, ax = plt.subplots(figsize=(10, 10))
-            fig.patch.set_visible(False)
-            ax.axis('off')
-
-            wedges, texts, autotexts = plt.pie(
-                color_counts.values(),
-                labels=None,
-                autopct='%1.1f%%',
-                colors=pastel_colors,
-                wedgeprops=dict(width=0.3),
-                pctdistance=0.85,
-                textprops={'fontsize': 24, 'color': 'white'}
-            )
-
-            plt.setp(
-                autotexts,
-                path_effects=[pe.withStroke(linewidth=3, foreground='black')]
-            )
+            embed, file = await create_total_videos_embed()
+        except ChartUnavailable:
+            await ctx.edit_original_message(content=CHART_UNAVAILABLE_MESSAGE)
+            return
+        await ctx.edit_original_message(embed=embed, file=file)
 
-            plt.legend(
-                [f"{color.capitalize()} {count}" for color, count in color_counts.items()],
-                loc="upper left",
-                bbox_to_anchor=(0, 1),
-                fontsize=14
-            )
-
-            plt.subplots_adjust(
-                left=0, bottom=0, right=1, top=1, wspace=0, hspace=0
-            )
-
-            img_bytes = io.BytesIO()
-            plt.savefig(img_bytes, format='png', transparent=True)
-            img_bytes.seek(0)
-
-            async with bot.http_session.post('https://0x0.st', data={'file': img_bytes}) as resp:
-                if resp.status != 200:
-                    return await ctx.send('Could not upload the image.')
-                else:
-                    img_url = await resp.text()
-
-            embed = disnake.Embed(
-                title=f"Total videos in the database ({total_videos})",
-                color=disnake.Color.blurple()
-            )
-            embed.set_image(url=img_url)
-
-            return embed
-        finally:
-            await db.close()
\ No newline at end of file
+    async def create_total_videos_embed():
+        color_labels = ["green", "red", "yellow"]
+        pastel_colors = ['#4E9A06', '#A40000', '#FDBF11']
+        stats = bot.video_manager.stats
+        color_counts = {color: stats.color_counts[color] for color in color_labels}
+
+        total_videos = sum(color_counts.values())
+
+        png = await bot.charts.donut(
+            list(color_counts.values()),
+            pastel_colors,
+            [f"{color.capitalize()} {count}" for color, count in color_counts.items()]
+        )
+
+        embed = disnake.Embed(
+            title=f"Total videos in the database ({total_videos})",
+            color=disnake.Color.blurple()
+        )
+        file = attach_chart(embed, png)
+
+        return embed, file
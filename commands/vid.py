@@ -1,17 +1,15 @@
-import io
 from datetime import datetime
 import re
 
-import aiosqlite
 import disnake
-import requests
 from disnake import ApplicationCommandInteraction, OptionChoice
 
 from config import GUILD_IDS
+from media_cache import canonical_media_url
 from private_config import TIKTOK_ARCHIVE_CHANNEL
 from urllib.parse import urlparse
 from utils import (
-    bot, autocomp_colours, fetch_all_hashtags, fetch_tiktok_content, shorten_url,
+    autocomp_colours, download_media, fetch_tiktok_content,
     has_role_check, insta_fetch_media, extract_urls
 )
 
@@ -37,18 +35,15 @@ async def fetch_content(session, url, content_type):
     return None, None, None, None
 
 
-async def download_video(session, video_url):
+async def download_video(session, video_url, cache=None, cache_key=None):
     if not isinstance(video_url, str):
         print(f"Invalid video URL: {video_url}")
         return None
 
-    async with session.get(video_url) as response:
-        if response.status == 200:
-            return io.BytesIO(await response.read())
-        return None
+    return await download_media(video_url, session, cache, cache_key)
 
 
-async def video_exists(name, original_discord_url, tiktok_original_link, insta_original_link, db_path="videos.db"):
+async def video_exists(pool, name, original_discord_url, tiktok_original_link, insta_original_link):
     query = """
     SELECT name, original_url, tiktok_original_link, insta_original_link 
     FROM videos 
@@ -57,7 +52,7 @@ async def video_exists(name, original_discord_url, tiktok_original_link, insta_o
     params = (name, original_discord_url,
               tiktok_original_link, insta_original_link)
     conflict_details = []
-    async with aiosqlite.connect(db_path) as db:
+    async with pool.read() as db:
         async with db.execute(query, params) as cursor:
             rows = await cursor.fetchall()
             for row in rows:
@@ -239,7 +234,8 @@ def setup(bot):
         final_url_for_storage = None
 
         if content_type in ["tiktok", "instagram"]:
-            video_data = await download_video(bot.http_session, video_url)
+            cache_key = bot.media_cache.key("video", canonical_media_url(original_link or normalized_url))
+            video_data = await download_video(bot.http_session, video_url, bot.media_cache, cache_key)
             if not video_data:
                 await inter.followup.send("Failed to download video content.", ephemeral=True)
                 return
@@ -249,7 +245,7 @@ def setup(bot):
                 discord_video_url = video_message.attachments[0].url
                 normalized_discord_url = normalize_discord_url(
                     discord_video_url)
-                final_url_for_storage = await shorten_url(normalized_discord_url)
+                final_url_for_storage = await bot.shortener.shorten(normalized_discord_url)
             else:
                 await inter.followup.send("Invalid upload channel ID.", ephemeral=True)
                 return
@@ -258,7 +254,7 @@ def setup(bot):
             if normalized_discord_url is None:
                 await inter.followup.send("The provided URL is invalid. Please use a valid Discord attachment URL.", ephemeral=True)
                 return
-            final_url_for_storage = await shorten_url(normalized_discord_url)
+            final_url_for_storage = await bot.shortener.shorten(normalized_discord_url)
 
         if not final_url_for_storage:
             await inter.followup.send("Failed to process the video URL.", ephemeral=True)
@@ -306,10 +302,8 @@ def setup(bot):
         return await autocomp_colours(inter, user_input)
 
     async def autocomplete_hashtag(inter: ApplicationCommandInteraction, user_input: str):
-        all_hashtags = await fetch_all_hashtags()
-        filtered_hashtags = [
-            ht for ht in all_hashtags if user_input.lower() in ht.lower()]
-        return [OptionChoice(name=ht, value=ht) for ht in filtered_hashtags][:25]
+        filtered_hashtags = inter.bot.video_manager.tag_vocabulary.search(user_input)
+        return [OptionChoice(name=ht, value=ht) for ht in filtered_hashtags]
 
     hashtag_option_names = [f"hashtag_{i}" for i in range(1, 11)]
     for option_name in hashtag_option_names:
@@ -1,8 +1,6 @@
 import math
-import aiosqlite
 import disnake
 from disnake import ButtonStyle
-from utils import bot
 from config import GUILD_IDS
 
 
@@ -19,8 +17,8 @@ def setup(bot):
         await ctx.response.send_message(embed=embed, view=view)
 
     async def fetch_videos(colour):
-        async with aiosqlite.connect("videos.db") as db:
-            query = "SELECT name, original_url FROM videos WHERE LOWER(color) = LOWER(?)"
+        async with bot.db.read() as db:
+            query = "SELECT name, original_url FROM videos WHERE color = ? COLLATE NOCASE"
             values = (colour,)
             async with db.execute(query, values) as cursor:
                 videos = await cursor.fetchall()
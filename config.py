@@ -1,5 +1,9 @@
+import asyncio
 import disnake
 import json
+import os
+import threading
+import time
 from private_config import (
     BOT_TOKEN, GUILD_IDS, ADMIN, ADMIN_ROLE, 
     GREEN, RED, YELLOW,
@@ -22,24 +26,131 @@ YELLOW_ROLE_ID = YELLOW
 
 MOD_LOG = MOD_LOG
 
+CONFIG_PATH = "config_data.json"
+
+# "ffmpeg" encodes slideshows straight from the stills; "moviepy" is the
+# original frame-by-frame renderer.
+SLIDESHOW_ENCODER = "ffmpeg"
+
+
+class ConfigStore:
+    def __init__(self, path=CONFIG_PATH, poll_interval=5.0, write_delay=0.5, max_retry_delay=60.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.write_delay = write_delay
+        self.max_retry_delay = max_retry_delay
+        self._retry_delay = 0.0
+        self._data = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        self._dirty = False
+        self._flush_handle = None
+        self._write_lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, "r") as file:
+                self._data = json.load(file)
+            self._mtime = mtime
+        except FileNotFoundError:
+            print(f"{self.path} file does not exist.")
+            self._data = {}
+            self._mtime = None
+
+    def _refresh(self):
+        # Unflushed local edits win over whatever is on disk.
+        now = time.monotonic()
+        if self._dirty or now - self._checked_at < self.poll_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            self._load()
+
+    @property
+    def data(self):
+        self._refresh()
+        return self._data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.data[key] = value
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(
+                self.write_delay, self._flush_in_background)
+
+    def _flush_in_background(self):
+        self._flush_handle = None
+        if not self._dirty:
+            return
+        contents = self._serialize()
+        asyncio.create_task(self._write_in_background(contents))
+
+    async def _write_in_background(self, contents):
+        if await asyncio.to_thread(self._write, contents):
+            self._retry_delay = 0.0
+            return
+        # The edit is still only in memory, so try again, backing off while
+        # the disk keeps failing.
+        self._retry_delay = min(max(self.write_delay, self._retry_delay * 2), self.max_retry_delay)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self._retry_delay, self._flush_in_background)
+
+    def _serialize(self):
+        self._dirty = False
+        return json.dumps(self._data, indent=4)
+
+    def _write(self, contents):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with self._write_lock:
+                with open(tmp_path, "w") as file:
+                    file.write(contents)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(tmp_path, self.path)
+                self._mtime = os.stat(self.path).st_mtime_ns
+            return True
+        except Exception as e:
+            print(f"Error writing {self.path}: {e}")
+            self._dirty = True
+            return False
+
+    def flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._dirty:
+            self._write(self._serialize())
+
+
+config_store = ConfigStore()
+
+
 def get_config_data():
-    try:
-        with open("config_data.json", "r") as file:
-            data = json.load(file)
-        return data
-    except FileNotFoundError:
-        print("config_data.json file does not exist.")
-        return {}
+    return config_store.data
+
 
 def get_cooldown():
-    config_data = get_config_data()
-    return config_data.get("cooldown", None)
+    return config_store.get("cooldown", None)
+
 
 def update_cooldown(value):
-    config_data = get_config_data()
-    config_data["cooldown"] = value
-    try:
-        with open("config_data.json", "w") as file:
-            json.dump(config_data, file)
-    except Exception as e:
-        print(f"An error occurred while updating cooldown: {e}")
\ No newline at end of file
+    config_store.set("cooldown", value)
@@ -0,0 +1,123 @@
+import heapq
+import random
+
+
+class ColorPool:
+    def __init__(self):
+        self.ready = []
+        self.positions = {}
+        self.cooling = []
+        self.played_at = {}
+
+    def add(self, url, played_at, threshold):
+        if played_at < threshold:
+            self._add_ready(url)
+        else:
+            self._add_cooling(url, played_at)
+
+    def remove(self, url):
+        if url in self.positions:
+            self._remove_ready(url)
+        else:
+            # The heap entry goes stale and is skipped when it surfaces.
+            self.played_at.pop(url, None)
+
+    def mark_played(self, url, played_at):
+        self.remove(url)
+        self._add_cooling(url, played_at)
+
+    def release_expired(self, threshold):
+        while self.cooling and self.cooling[0][0] < threshold:
+            played_at, url = heapq.heappop(self.cooling)
+            if self.played_at.get(url) == played_at:
+                del self.played_at[url]
+                self._add_ready(url)
+
+    def _add_ready(self, url):
+        self.positions[url] = len(self.ready)
+        self.ready.append(url)
+
+    def _remove_ready(self, url):
+        index = self.positions.pop(url)
+        last = self.ready.pop()
+        if last != url:
+            self.ready[index] = last
+            self.positions[last] = index
+
+    def _add_cooling(self, url, played_at):
+        self.played_at[url] = played_at
+        heapq.heappush(self.cooling, (played_at, url))
+
+
+class CooldownIndex:
+    def __init__(self):
+        self.pools = {}
+        self.colors = {}
+        self.cooldown = None
+
+    @property
+    def built(self):
+        return self.cooldown is not None
+
+    def invalidate(self):
+        self.pools = {}
+        self.colors = {}
+        self.cooldown = None
+
+    def rebuild(self, video_lists, played_videos, current_time, cooldown):
+        self.invalidate()
+        self.cooldown = cooldown
+        for color, urls in video_lists.items():
+            for url in urls:
+                self.add(color, url, played_videos.get(url, 0), current_time)
+
+    def add(self, color, url, played_at, current_time):
+        if not self.built:
+            return
+        if url in self.colors:
+            self.remove(url)
+        threshold = current_time - self.cooldown
+        self.pools.setdefault(color, ColorPool()).add(url, played_at, threshold)
+        self.colors[url] = color
+
+    def remove(self, url):
+        color = self.colors.pop(url, None)
+        if color is not None:
+            self.pools[color].remove(url)
+
+    def mark_played(self, url, played_at):
+        color = self.colors.get(url)
+        if color is not None:
+            self.pools[color].mark_played(url, played_at)
+
+    def cooling_count(self, current_time):
+        threshold = current_time - self.cooldown
+        count = 0
+        for pool in self.pools.values():
+            pool.release_expired(threshold)
+            count += len(pool.played_at)
+        return count
+
+    def pick(self, colors, current_time):
+        threshold = current_time - self.cooldown
+        pools = []
+        total = 0
+        for color in colors:
+            pool = self.pools.get(color)
+            if pool is None:
+                continue
+            pool.release_expired(threshold)
+            if pool.ready:
+                pools.append(pool)
+                total += len(pool.ready)
+
+        if not total:
+            return None
+
+        # Weight each colour by its ready count so the pick stays uniform
+        # over the union, like shuffling the combined list did.
+        index = random.randrange(total)
+        for pool in pools:
+            if index < len(pool.ready):
+                return pool.ready[index]
+            index -= len(pool.ready)
@@ -1,15 +1,257 @@
 import aiosqlite
+import asyncio
+import datetime
 import random
-import time
 import logging
 import json
 import os
+import re
+from contextlib import asynccontextmanager
 
 DATABASE_NAME = "videos.db"
 
 video_lists = {}
 last_reset = {}
 
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 134217728",
+    "PRAGMA foreign_keys = ON",
+)
+
+
+class ConnectionPool:
+    def __init__(self, db_path=DATABASE_NAME, readers=4):
+        self.db_path = db_path
+        self.reader_count = readers
+        self._writer = None
+        self._write_lock = asyncio.Lock()
+        self._open_lock = asyncio.Lock()
+        self._readers = asyncio.Queue()
+        self._all_readers = []
+
+    async def _connect(self, read_only=False):
+        db = await aiosqlite.connect(self.db_path)
+        for pragma in CONNECTION_PRAGMAS:
+            await db.execute(pragma)
+        if read_only:
+            await db.execute("PRAGMA query_only = ON")
+        return db
+
+    async def open(self):
+        async with self._open_lock:
+            if self._writer is not None:
+                return
+            self._writer = await self._connect()
+            await self._writer.execute("PRAGMA journal_mode = WAL")
+            await self._writer.commit()
+            for _ in range(self.reader_count):
+                reader = await self._connect(read_only=True)
+                self._all_readers.append(reader)
+                self._readers.put_nowait(reader)
+
+    async def close(self):
+        async with self._open_lock:
+            if self._writer is None:
+                return
+            async with self._write_lock:
+                await self._writer.close()
+                self._writer = None
+            for reader in self._all_readers:
+                await reader.close()
+            self._all_readers = []
+            self._readers = asyncio.Queue()
+
+    @asynccontextmanager
+    async def read(self):
+        if self._writer is None:
+            await self.open()
+        reader = await self._readers.get()
+        try:
+            yield reader
+        finally:
+            self._readers.put_nowait(reader)
+
+    @asynccontextmanager
+    async def write(self):
+        if self._writer is None:
+            await self.open()
+        async with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            else:
+                await self._writer.commit()
+
+
+FTS_COLUMNS = ("name", "hashtags", "added_by")
+
+FTS_SCHEMA = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+        name, hashtags, added_by,
+        content='videos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS videos_fts_insert AFTER INSERT ON videos BEGIN
+        INSERT INTO videos_fts(rowid, name, hashtags, added_by)
+        VALUES (new.id, new.name, new.hashtags, new.added_by);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS videos_fts_delete AFTER DELETE ON videos BEGIN
+        INSERT INTO videos_fts(videos_fts, rowid, name, hashtags, added_by)
+        VALUES ('delete', old.id, old.name, old.hashtags, old.added_by);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS videos_fts_update AFTER UPDATE OF name, hashtags, added_by ON videos BEGIN
+        INSERT INTO videos_fts(videos_fts, rowid, name, hashtags, added_by)
+        VALUES ('delete', old.id, old.name, old.hashtags, old.added_by);
+        INSERT INTO videos_fts(rowid, name, hashtags, added_by)
+        VALUES (new.id, new.name, new.hashtags, new.added_by);
+    END
+    """,
+)
+
+
+async def create_fts_index(db):
+    cursor = await db.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'videos_fts'")
+    exists = await cursor.fetchone()
+    for statement in FTS_SCHEMA:
+        await db.execute(statement)
+    if not exists:
+        await db.execute("INSERT INTO videos_fts(videos_fts) VALUES ('rebuild')")
+
+
+def split_hashtags(hashtags):
+    return {tag.strip().lower() for tag in (hashtags or "").split(',') if tag.strip()}
+
+
+async def create_hashtag_table(db):
+    cursor = await db.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'video_hashtags'")
+    exists = await cursor.fetchone()
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS video_hashtags (
+            video_id INTEGER NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (video_id, tag)
+        ) WITHOUT ROWID
+    """)
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_video_hashtags_tag ON video_hashtags(tag)")
+    if not exists:
+        async with db.execute("SELECT id, hashtags FROM videos WHERE hashtags IS NOT NULL AND hashtags != ''") as cursor:
+            rows = await cursor.fetchall()
+        await db.executemany(
+            "INSERT OR IGNORE INTO video_hashtags (video_id, tag) VALUES (?, ?)",
+            [(video_id, tag) for video_id, hashtags in rows for tag in split_hashtags(hashtags)])
+
+
+async def create_short_links_table(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS short_links (
+            url TEXT PRIMARY KEY,
+            short_url TEXT NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+    """)
+
+
+def retire_legacy_file(path):
+    try:
+        os.replace(path, f"{path}.migrated")
+    except OSError as e:
+        print(f"Error renaming {path} after migrating it: {e}")
+
+
+async def create_scheduled_deletions_table(db, legacy_path="deletion_tasks.json"):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS scheduled_deletions (
+            message_id INTEGER PRIMARY KEY,
+            channel_id INTEGER NOT NULL,
+            due_at REAL NOT NULL
+        )
+    """)
+    if not os.path.isfile(legacy_path):
+        return
+    with open(legacy_path, 'r') as file:
+        deletion_data = json.load(file)
+    rows = []
+    for message_id, info in deletion_data.items():
+        deletion_time = datetime.datetime.fromisoformat(info['deletion_time']).replace(tzinfo=datetime.timezone.utc)
+        rows.append((int(message_id), int(info['channel_id']), deletion_time.timestamp()))
+    await db.executemany(
+        "INSERT OR IGNORE INTO scheduled_deletions (message_id, channel_id, due_at) VALUES (?, ?, ?)", rows)
+    print(f"Imported {len(rows)} scheduled deletions from {legacy_path}.")
+    return [lambda: retire_legacy_file(legacy_path)]
+
+
+async def create_timers_table(db, legacy_role_path="role_timestamps.json"):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS timers (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            due_at REAL NOT NULL,
+            payload TEXT NOT NULL,
+            PRIMARY KEY (kind, key)
+        ) WITHOUT ROWID
+    """)
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_timers_due_at ON timers(due_at)")
+
+    await db.execute("""
+        INSERT OR IGNORE INTO timers (kind, key, due_at, payload)
+        SELECT 'delete_message', CAST(message_id AS TEXT), due_at,
+               json_object('message_id', message_id, 'channel_id', channel_id)
+        FROM scheduled_deletions
+    """)
+    await db.execute("DROP TABLE scheduled_deletions")
+
+    if not os.path.isfile(legacy_role_path):
+        return
+    with open(legacy_role_path, 'r') as file:
+        role_data = json.load(file)
+    rows = []
+    for guild_id, users in role_data.items():
+        if 'removal_timestamp' in users:
+            # remove_role_later used to overwrite the file with a single
+            # guild's entries, losing the guild ID.
+            print(f"Skipping role expiry for user {guild_id}: guild unknown.")
+            continue
+        for user_id, info in users.items():
+            payload = {"guild_id": int(guild_id), "user_id": int(user_id), "role_id": int(info['role_id'])}
+            rows.append(("role_expiry", f"{guild_id}:{user_id}:{info['role_id']}",
+                         info['removal_timestamp'], json.dumps(payload)))
+    await db.executemany("INSERT OR IGNORE INTO timers (kind, key, due_at, payload) VALUES (?, ?, ?, ?)", rows)
+    print(f"Imported {len(rows)} role expiries from {legacy_role_path}.")
+    return [lambda: retire_legacy_file(legacy_role_path)]
+
+
+async def set_video_hashtags(db, video_id, hashtags):
+    await db.execute("DELETE FROM video_hashtags WHERE video_id = ?", (video_id,))
+    await db.executemany(
+        "INSERT INTO video_hashtags (video_id, tag) VALUES (?, ?)",
+        [(video_id, tag) for tag in split_hashtags(hashtags)])
+
+
+def fts_match_expression(text, column=None, any_term=False):
+    terms = re.findall(r"\w+", text.lower())
+    if not terms:
+        return None
+    expression = (" OR " if any_term else " ").join(f'"{term}"*' for term in terms)
+    if column:
+        expression = f"{column} : ({expression})"
+    return expression
+
 
 def fisher_yates_shuffle(arr):
     for i in range(len(arr) - 1, 0, -1):
@@ -17,58 +259,31 @@ def fisher_yates_shuffle(arr):
         arr[i], arr[j] = arr[j], arr[i]
 
 
-async def initialize_database():
+async def add_video_to_hall_of_fame(pool, id):
+    query = "UPDATE videos SET is_hall_of_fame = ? WHERE id = ?"
+    values = (True, id)
     try:
-        async with aiosqlite.connect(DATABASE_NAME) as db:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS videos (
-                    id INTEGER PRIMARY KEY,
-                    name TEXT,
-                    url TEXT,
-                    color TEXT,
-                    original_url TEXT,
-                    added_by TEXT,
-                    tiktok_author_link TEXT,
-                    tiktok_original_link TEXT,
-                    tiktok_sound_link TEXT,
-                    insta_original_link TEXT,
-                    date_added TEXT,
-                    is_hall_of_fame BOOLEAN DEFAULT 0
-                )
-            """)
-            await db.commit()
-    except aiosqlite.OperationalError as e:
-        logging.error(f"Error initializing the database: {e}")
-
-
-async def add_video_to_hall_of_fame(id):
-    async with aiosqlite.connect(DATABASE_NAME) as db:
-        query = "UPDATE videos SET is_hall_of_fame = ? WHERE id = ?"
-        values = (True, id)
-        try:
+        async with pool.write() as db:
             await db.execute(query, values)
-            await db.commit()
-        except aiosqlite.IntegrityError as e:
-            logging.error(f"Error adding video to the hall of fame: {e}")
+    except aiosqlite.IntegrityError as e:
+        logging.error(f"Error adding video to the hall of fame: {e}")
 
 
-async def get_hall_of_fame_videos():
-    async with aiosqlite.connect(DATABASE_NAME) as db:
-        query = "SELECT id, original_url FROM videos WHERE is_hall_of_fame = ?"
-        values = (True,)
+async def get_hall_of_fame_videos(pool):
+    async with pool.read() as db:
+        query = "SELECT id, original_url FROM videos WHERE is_hall_of_fame = 1"
         try:
-            cursor = await db.execute(query, values)
+            cursor = await db.execute(query)
             return await cursor.fetchall()
         except aiosqlite.IntegrityError as e:
             logging.error(f"Error retrieving hall of fame videos: {e}")
 
 
-async def synchronize_cache_with_database():
+async def synchronize_cache_with_database(pool):
     cache_file_path = "video_data.json"
-    db_path = "videos.db"
     conflicts = []
 
-    async with aiosqlite.connect(db_path) as db:
+    async with pool.write() as db:
         query = "SELECT original_url, COUNT(*) c FROM videos GROUP BY original_url HAVING c > 1"
         cursor = await db.execute(query)
         duplicates = await cursor.fetchall()
@@ -84,11 +299,9 @@ async def synchronize_cache_with_database():
                     delete_query = "DELETE FROM videos WHERE id = ?"
                     await db.execute(delete_query, (id_to_delete,))
 
-            await db.commit()
-
         db_videos = {}
         for color in ["green", "red", "yellow"]:
-            async with db.execute("SELECT original_url, name FROM videos WHERE LOWER(color) = ?", (color.lower(),)) as cursor:
+            async with db.execute("SELECT original_url, name FROM videos WHERE color = ? COLLATE NOCASE", (color,)) as cursor:
                 db_videos[color] = {row[0]: row[1] for row in await cursor.fetchall()}
 
     if os.path.exists(cache_file_path):
@@ -0,0 +1,72 @@
+import numpy as np
+from rapidfuzz import fuzz, process
+
+EXACT_NAME_SCORE = 10000
+EXACT_HASHTAG_SCORE = 7500
+
+
+class FuzzyIndex:
+    def __init__(self, min_score=60, hashtag_weight=0.9):
+        self.min_score = min_score
+        self.hashtag_weight = hashtag_weight
+        self.names = []
+        self.choices = []
+        self.owners = np.empty(0, dtype=np.int64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.name_ids = {}
+        self.hashtag_owners = {}
+        self.stale = True
+
+    def invalidate(self):
+        self.stale = True
+
+    def rebuild(self, videos_info):
+        names = []
+        choices = []
+        owners = []
+        weights = []
+        hashtag_owners = {}
+
+        for video_name, video_info in videos_info.items():
+            if video_info is None:
+                continue
+            owner = len(names)
+            names.append(video_name)
+            choices.append(video_name.lower())
+            owners.append(owner)
+            weights.append(1.0)
+
+            hashtags = (video_info.get("hashtags") or "").lower().split(',')
+            for tag in {tag.strip() for tag in hashtags if tag.strip()}:
+                choices.append(tag)
+                owners.append(owner)
+                weights.append(self.hashtag_weight)
+                hashtag_owners.setdefault(tag, []).append(owner)
+
+        self.names = names
+        self.choices = choices
+        self.owners = np.array(owners, dtype=np.int64)
+        self.weights = np.array(weights, dtype=np.float64)
+        self.name_ids = {name.lower(): owner for owner, name in enumerate(names)}
+        self.hashtag_owners = hashtag_owners
+        self.stale = False
+
+    def search(self, user_input, limit=25):
+        if not self.choices:
+            return []
+
+        scores = process.cdist(
+            [user_input], self.choices, scorer=fuzz.WRatio,
+            score_cutoff=self.min_score, workers=-1)[0]
+
+        best = np.zeros(len(self.names), dtype=np.float64)
+        np.maximum.at(best, self.owners, scores * self.weights)
+
+        for owner in self.hashtag_owners.get(user_input, ()):
+            best[owner] = EXACT_HASHTAG_SCORE
+        if user_input in self.name_ids:
+            best[self.name_ids[user_input]] = EXACT_NAME_SCORE
+
+        matches = np.flatnonzero(best > self.min_score)
+        ranked = matches[np.argsort(-best[matches], kind="stable")][:limit]
+        return [self.names[owner] for owner in ranked]
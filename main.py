@@ -1,20 +1,30 @@
 import asyncio
-import disnake
-from disnake.ext import commands
-
-from config import BOT_TOKEN, INTENTS, GUILD_IDS
-from utils import CustomBot, VideoManager, load_setup_data
 import pkgutil
 
-print("Starting the bot...")
+# Render workers are spawned and re-import this file as __mp_main__, so
+# nothing at module level may import the bot or touch shared state.
 
 
 async def setup_video_manager(bot):
+    from video_manager import VideoManager
+
     bot.video_manager = await VideoManager.create(bot)
     await bot.video_manager.load_videos_info()
 
 
+async def setup_timers(bot):
+    from utils import ROLE_EXPIRY_TIMER, expire_roles
+
+    async def handle_role_expiry(payloads):
+        await expire_roles(bot, payloads)
+
+    bot.timers.register(ROLE_EXPIRY_TIMER, handle_role_expiry)
+
+
 async def setup_reaction_handler_on_restart(bot):
+    import disnake
+    from utils import load_setup_data
+
     for guild in bot.guilds:
         message_id, channel_id, target_channel_id = load_setup_data(guild.id)
         if message_id and target_channel_id:
@@ -27,10 +37,16 @@ async def setup_reaction_handler_on_restart(bot):
 
 
 async def main():
+    from config import BOT_TOKEN, INTENTS, GUILD_IDS
+    from utils import CustomBot
+
     bot = CustomBot(intents=INTENTS, test_guilds=GUILD_IDS)
     print("Bot created...")
 
+    bot.render_pool.start()
+    bot.chart_pool.start()
     await setup_video_manager(bot)
+    await setup_timers(bot)
 
     for _, name, _ in pkgutil.iter_modules(['commands']):
         bot.load_extension(f'commands.{name}')
@@ -38,6 +54,7 @@ async def main():
     @bot.event
     async def on_ready():
         print(f"Bot is ready as {bot.user}!")
+        bot.timers.start()
         await setup_reaction_handler_on_restart(bot)
 
     try:
@@ -47,6 +64,7 @@ async def main():
         await bot.close()
 
 if __name__ == "__main__":
+    print("Starting the bot...")
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
 
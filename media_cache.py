@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse, urlunparse
+
+STALE_TEMP_AGE = 6 * 3600
+
+re_tiktok_id = re.compile(r'/(?:video|photo)/(\d+)')
+re_instagram_shortcode = re.compile(r'/(?:p|reel|reels|tv)/([^/?#]+)')
+
+
+def canonical_media_url(url):
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+
+    # Share links carry tracking parameters and differ by author handle, so
+    # TikTok and Instagram media are keyed by their post id alone.
+    if host.endswith("tiktok.com") and (match := re_tiktok_id.search(parsed.path)):
+        return f"tiktok:{match.group(1)}"
+    if host.endswith("instagram.com") and (match := re_instagram_shortcode.search(parsed.path)):
+        return f"instagram:{match.group(1)}"
+
+    return urlunparse((parsed.scheme.lower(), host, parsed.path.rstrip('/'), "", parsed.query, ""))
+
+
+class MediaCache:
+    def __init__(self, directory="media_cache", max_bytes=2 * 1024 ** 3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.storing = {}
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        found = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                # Left behind by a write that never finished. Recent ones may
+                # belong to a write still in progress in another process.
+                path = os.path.join(self.directory, name)
+                try:
+                    if time.time() - os.path.getmtime(path) > STALE_TEMP_AGE:
+                        _remove_quietly(path)
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(".json"):
+                continue
+            key = name[:-5]
+            try:
+                with open(self._sidecar_path(key), "r") as f:
+                    metadata = json.load(f)
+                stat = os.stat(self._blob_path(key))
+            except (OSError, json.JSONDecodeError):
+                self._remove_files(key)
+                continue
+            found.append((stat.st_mtime, key, stat.st_size, metadata))
+
+        # Blob mtimes are bumped on every hit, so they double as LRU order.
+        for _, key, size, metadata in sorted(found):
+            self.entries[key] = (size, metadata)
+            self.total_bytes += size
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    def _blob_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _sidecar_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def metadata(self, key):
+        entry = self.entries.get(key)
+        return entry[1] if entry else None
+
+    def open(self, key):
+        if key not in self.entries:
+            return None
+        path = self._blob_path(key)
+        try:
+            f = open(path, "rb")
+            os.utime(path)
+        except OSError:
+            self._forget(key)
+            return None
+        self.entries.move_to_end(key)
+        return f
+
+    async def put_stream(self, key, fp, **metadata):
+        return await self._store(key, self._write_stream, fp, metadata)
+
+    async def put_file(self, key, path, **metadata):
+        return await self._store(key, self._move_file, path, metadata)
+
+    async def _store(self, key, writer, source, metadata):
+        # Concurrent puts of the same media share the first write; the later
+        # copy is dropped rather than racing it onto the same blob.
+        task = self.storing.get(key)
+        if task is not None:
+            path = await asyncio.shield(task)
+            if path is not None and writer == self._move_file:
+                await asyncio.to_thread(_remove_quietly, source)
+            return path
+
+        task = asyncio.create_task(self._write(key, writer, source, metadata))
+        self.storing[key] = task
+        task.add_done_callback(lambda _: self.storing.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _write(self, key, writer, source, metadata):
+        metadata = {**metadata, "cached_at": int(time.time())}
+        try:
+            size = await asyncio.to_thread(writer, key, source, metadata)
+        except OSError as e:
+            print(f"Error writing to media cache: {e}")
+            return None
+
+        if key in self.entries:
+            self.total_bytes -= self.entries[key][0]
+        self.entries[key] = (size, metadata)
+        self.entries.move_to_end(key)
+        self.total_bytes += size
+        self._evict()
+        return self._blob_path(key)
+
+    def _temp_path(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        return tmp_path
+
+    def _write_stream(self, key, fp, metadata):
+        tmp_path = self._temp_path()
+        fp.seek(0)
+        try:
+            with open(tmp_path, "wb") as f:
+                shutil.copyfileobj(fp, f)
+        except BaseException:
+            _remove_quietly(tmp_path)
+            raise
+        finally:
+            fp.seek(0)
+        return self._commit(key, tmp_path, metadata)
+
+    def _move_file(self, key, path, metadata):
+        tmp_path = self._temp_path()
+        try:
+            shutil.move(path, tmp_path)
+        except BaseException:
+            _remove_quietly(tmp_path)
+            raise
+        return self._commit(key, tmp_path, metadata)
+
+    def _commit(self, key, tmp_path, metadata):
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, self._blob_path(key))
+        self._write_sidecar(key, metadata)
+        return size
+
+    def _write_sidecar(self, key, metadata):
+        tmp_path = self._temp_path()
+        with open(tmp_path, "w") as f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, self._sidecar_path(key))
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            key = next(iter(self.entries))
+            self._forget(key)
+
+    def _forget(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.total_bytes -= entry[0]
+        self._remove_files(key)
+
+    def _remove_files(self, key):
+        for path in (self._blob_path(key), self._sidecar_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error removing cached media {path}: {e}")
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,104 @@
+from database import (
+    create_fts_index, create_hashtag_table, create_scheduled_deletions_table, create_short_links_table,
+    create_timers_table
+)
+
+
+async def create_videos_table(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS videos (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            url TEXT,
+            color TEXT,
+            original_url TEXT,
+            added_by TEXT,
+            tiktok_author_link TEXT,
+            tiktok_original_link TEXT,
+            tiktok_sound_link TEXT,
+            insta_original_link TEXT,
+            date_added TEXT,
+            is_hall_of_fame BOOLEAN DEFAULT 0,
+            hashtags TEXT
+        )
+    """)
+    # Databases created before hashtags existed still lack the column.
+    cursor = await db.execute("PRAGMA table_info(videos)")
+    columns = [column[1] for column in await cursor.fetchall()]
+    if 'hashtags' not in columns:
+        await db.execute("ALTER TABLE videos ADD COLUMN hashtags TEXT")
+
+
+async def dedupe_original_urls(db):
+    cursor = await db.execute("""
+        SELECT id, name, original_url FROM videos
+        WHERE original_url IS NOT NULL
+        AND id NOT IN (SELECT MIN(id) FROM videos WHERE original_url IS NOT NULL GROUP BY original_url)
+    """)
+    for video_id, name, original_url in await cursor.fetchall():
+        print(f"Removing duplicate of {original_url} (ID: {video_id}, Name: {name}) before adding a unique index.")
+        await db.execute("DELETE FROM videos WHERE id = ?", (video_id,))
+
+
+async def clear_duplicate_links(db, column):
+    # Only the redundant source link is dropped; the video itself stays.
+    cursor = await db.execute(f"""
+        SELECT id, name, {column} FROM videos
+        WHERE {column} IS NOT NULL
+        AND id NOT IN (SELECT MIN(id) FROM videos WHERE {column} IS NOT NULL GROUP BY {column})
+    """)
+    for video_id, name, link in await cursor.fetchall():
+        print(f"Clearing duplicate {column} {link} from ID: {video_id} (Name: {name}).")
+        await db.execute(f"UPDATE videos SET {column} = NULL WHERE id = ?", (video_id,))
+
+
+async def create_video_indexes(db):
+    await dedupe_original_urls(db)
+    await clear_duplicate_links(db, "tiktok_original_link")
+    await clear_duplicate_links(db, "insta_original_link")
+
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_videos_name ON videos(name)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_videos_color ON videos(color COLLATE NOCASE)")
+    await db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_videos_original_url ON videos(original_url)")
+    await db.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_videos_tiktok_original_link
+        ON videos(tiktok_original_link) WHERE tiktok_original_link IS NOT NULL
+    """)
+    await db.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_videos_insta_original_link
+        ON videos(insta_original_link) WHERE insta_original_link IS NOT NULL
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_videos_hall_of_fame
+        ON videos(is_hall_of_fame) WHERE is_hall_of_fame = 1
+    """)
+
+
+# Append only: a database at user_version N has run the first N entries.
+# Every step is written to be safe on databases that predate versioning.
+# A step may return callables to run once its transaction has committed,
+# for side effects such as retiring imported files that can't roll back.
+MIGRATIONS = (
+    create_videos_table,
+    create_fts_index,
+    create_hashtag_table,
+    create_short_links_table,
+    create_video_indexes,
+    create_scheduled_deletions_table,
+    create_timers_table,
+)
+
+
+async def run_migrations(pool):
+    async with pool.read() as db:
+        cursor = await db.execute("PRAGMA user_version")
+        version = (await cursor.fetchone())[0]
+
+    for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        async with pool.write() as db:
+            await db.execute("BEGIN")
+            after_commit = await migration(db)
+            await db.execute(f"PRAGMA user_version = {target}")
+        for action in after_commit or ():
+            action()
+        print(f"Migrated {pool.db_path} to schema version {target} ({migration.__name__}).")
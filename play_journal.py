@@ -0,0 +1,101 @@
+import asyncio
+import json
+import os
+import threading
+
+
+class PlayJournal:
+    def __init__(self, path="video_data.journal", flush_interval=2.0, compact_after=1000):
+        self.path = path
+        self.rotated_path = f"{path}.old"
+        self.flush_interval = flush_interval
+        self.compact_after = compact_after
+        self.entries = 0
+        self._pending = []
+        self._file_lock = threading.Lock()
+        # Orders journal file operations on the loop side, so the thread lock
+        # is never waited on by the event loop itself.
+        self._io_lock = asyncio.Lock()
+        self._flush_task = None
+
+    def replay(self, played_videos):
+        # A rotated journal only survives a crash between rotate() and the
+        # snapshot landing on disk, so it is always older than the live one.
+        for path in (self.rotated_path, self.path):
+            if not os.path.isfile(path):
+                continue
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn final line from an interrupted append.
+                        continue
+                    url, played_at = entry["url"], entry["played_at"]
+                    if played_at > played_videos.get(url, 0):
+                        played_videos[url] = played_at
+                    if path == self.path:
+                        self.entries += 1
+
+    def append(self, url, played_at):
+        self._pending.append(json.dumps({"url": url, "played_at": played_at}))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            async with self._io_lock:
+                await asyncio.to_thread(self._write_batch, batch)
+        except OSError as e:
+            print(f"Error writing play journal: {e}")
+            self._pending[:0] = batch
+
+    def _write_batch(self, batch):
+        with self._file_lock:
+            with open(self.path, "a") as f:
+                f.write("\n".join(batch) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries += len(batch)
+
+    @property
+    def needs_compaction(self):
+        return self.entries >= self.compact_after
+
+    async def rotate(self):
+        # Everything pending or already on disk is covered by the snapshot
+        # the caller is about to write, so it can be set aside. Pending
+        # entries are dropped before the first await, and the lock is FIFO,
+        # so flushes started after the snapshot land in the new journal.
+        self._pending = []
+        async with self._io_lock:
+            await asyncio.to_thread(self._rotate_files)
+
+    def _rotate_files(self):
+        with self._file_lock:
+            if os.path.isfile(self.path):
+                if os.path.isfile(self.rotated_path):
+                    # The previous snapshot never landed; keep both journals.
+                    with open(self.path, "r") as src, open(self.rotated_path, "a") as dst:
+                        dst.write(src.read())
+                    os.remove(self.path)
+                else:
+                    os.replace(self.path, self.rotated_path)
+            self.entries = 0
+
+    def discard_rotated(self):
+        with self._file_lock:
+            if os.path.isfile(self.rotated_path):
+                os.remove(self.rotated_path)
+
+    async def close(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
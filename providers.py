@@ -0,0 +1,133 @@
+import asyncio
+import math
+import time
+from collections import deque
+
+
+class ProviderError(Exception):
+    pass
+
+
+class ProviderHealth:
+    def __init__(self, window=50, failure_threshold=5, reset_after=60.0):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def record_success(self, latency):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def record_failure(self, latency):
+        self.latencies.append(latency)
+        self.outcomes.append(False)
+        self.probe_in_flight = False
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    @property
+    def success_rate(self):
+        if not self.outcomes:
+            return 1.0
+        return sum(self.outcomes) / len(self.outcomes)
+
+    def p95(self, default):
+        if not self.latencies:
+            return default
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+    def available(self):
+        if self.opened_at is None:
+            return True
+        # Half-open: once the cool-off has passed, let one request through.
+        # Another failure re-opens the circuit straight away.
+        if self.probe_in_flight:
+            return False
+        return time.monotonic() - self.opened_at >= self.reset_after
+
+    def begin_attempt(self):
+        if self.opened_at is not None:
+            self.probe_in_flight = True
+
+
+class Provider:
+    def __init__(self, name, fetch, timeout=10.0):
+        self.name = name
+        self.fetch = fetch
+        self.timeout = timeout
+        self.health = ProviderHealth()
+
+
+class ProviderRouter:
+    def __init__(self, providers, min_hedge_delay=0.5, default_hedge_delay=2.0, hedge=True):
+        self.providers = providers
+        self.hedge = hedge
+        self.min_hedge_delay = min_hedge_delay
+        self.default_hedge_delay = default_hedge_delay
+
+    def ranked(self):
+        available = [provider for provider in self.providers if provider.health.available()]
+        if not available:
+            # Every circuit is open; trying anyway beats failing outright.
+            available = list(self.providers)
+        return sorted(available, key=lambda provider: (
+            -round(provider.health.success_rate, 1), provider.health.p95(provider.timeout)))
+
+    def hedge_delay(self, provider):
+        delay = provider.health.p95(self.default_hedge_delay)
+        return min(max(delay, self.min_hedge_delay), provider.timeout)
+
+    async def _attempt(self, provider, args):
+        started = time.monotonic()
+        provider.health.begin_attempt()
+        try:
+            result = await asyncio.wait_for(provider.fetch(*args), provider.timeout)
+        except asyncio.CancelledError:
+            # A hedged loser says nothing about health, but frees the probe.
+            provider.health.probe_in_flight = False
+            raise
+        except Exception as e:
+            print(f"{provider.name} failed: {e!r}")
+            provider.health.record_failure(time.monotonic() - started)
+            return None
+        provider.health.record_success(time.monotonic() - started)
+        return result
+
+    async def fetch(self, *args):
+        # Start with the healthiest provider and hedge to the next one if it
+        # has not answered within its usual p95 latency. The first usable
+        # answer wins and the remaining attempts are cancelled. Without
+        # hedging, the next provider only runs once the previous one failed.
+        queue = deque(self.ranked())
+        pending = set()
+        deadline = None
+        try:
+            while queue or pending:
+                if queue and (not pending or (self.hedge and time.monotonic() >= deadline)):
+                    provider = queue.popleft()
+                    pending.add(asyncio.create_task(self._attempt(provider, args)))
+                    deadline = time.monotonic() + self.hedge_delay(provider)
+
+                timeout = max(0.0, deadline - time.monotonic()) if queue and self.hedge else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result is not None:
+                        return result
+                if done:
+                    # An attempt came back empty, so move on without waiting
+                    # out the hedge delay.
+                    deadline = time.monotonic()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,73 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+class RenderQueueFull(Exception):
+    pass
+
+
+class RenderPool:
+    def __init__(self, max_workers=None, max_pending=8, timeout=300):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self._executor = None
+
+    def start(self):
+        # Spawned workers start from a fresh interpreter, which works on every
+        # platform and is safe to repeat once the bot has threads running.
+        # Each worker re-imports the main script and the job's module, so jobs
+        # live in modules that never import utils (slideshow, chart_render)
+        # and main.py keeps its bot imports inside functions. The warm-up jobs
+        # get the interpreters booting without blocking the caller.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"))
+            for _ in range(self.max_workers):
+                self._executor.submit(int)
+
+    async def run(self, fn, *args, timeout=None, discard=None):
+        if self.pending >= self.max_pending:
+            raise RenderQueueFull()
+
+        self.start()
+        self.pending += 1
+        try:
+            try:
+                future = self._executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._executor = None
+                self.start()
+                future = self._executor.submit(fn, *args)
+
+            # A timeout only stops waiting: the worker keeps rendering until
+            # the job finishes, and its slot stays busy until then.
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                # A running job can't be interrupted, so clean up whatever it
+                # eventually produces instead of leaking it.
+                if discard is not None and not future.cancel():
+                    future.add_done_callback(lambda done: _discard_result(done, discard))
+                raise
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _discard_result(future, discard):
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        discard(future.result())
+    except Exception as e:
+        print(f"Error discarding abandoned render: {e}")
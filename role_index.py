@@ -0,0 +1,37 @@
+from collections import defaultdict
+
+
+class RoleIndex:
+    def __init__(self):
+        self.holders_by_guild = defaultdict(lambda: defaultdict(set))
+
+    def rebuild(self, guild):
+        holders = defaultdict(set)
+        for member in guild.members:
+            for role in member.roles:
+                holders[role.id].add(member.id)
+        self.holders_by_guild[guild.id] = holders
+
+    def holders(self, guild_id, role_id):
+        return self.holders_by_guild[guild_id].get(role_id, set())
+
+    def add_member(self, member):
+        holders = self.holders_by_guild[member.guild.id]
+        for role in member.roles:
+            holders[role.id].add(member.id)
+
+    def remove_member(self, member):
+        holders = self.holders_by_guild[member.guild.id]
+        for role in member.roles:
+            holders[role.id].discard(member.id)
+
+    def update_member(self, before, after):
+        before_ids = {role.id for role in before.roles}
+        after_ids = {role.id for role in after.roles}
+        if before_ids == after_ids:
+            return
+        holders = self.holders_by_guild[after.guild.id]
+        for role_id in before_ids - after_ids:
+            holders[role_id].discard(after.id)
+        for role_id in after_ids - before_ids:
+            holders[role_id].add(after.id)
@@ -0,0 +1,263 @@
+import io
+import math
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageOps
+from moviepy.editor import ImageClip, concatenate_videoclips, AudioFileClip
+from moviepy.audio.fx.all import audio_loop
+
+try:
+    from imageio_ffmpeg import get_ffmpeg_exe
+except ImportError:
+    get_ffmpeg_exe = None
+
+FFMPEG_TIMEOUT = 240
+
+
+# Everything here runs inside a render worker process, so it only deals in
+# plain bytes and file paths and never touches the bot or the event loop.
+
+
+def create_audio_clip(audio_bytes):
+    try:
+        with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as tmp_audio:
+            tmp_audio.write(audio_bytes)
+            tmp_audio_path = tmp_audio.name
+        return AudioFileClip(tmp_audio_path), tmp_audio_path, None
+    except Exception as e:
+        return None, None, str(e)
+
+
+def process_image(img, video_frame_size, slide_duration):
+    try:
+        aspect_ratio = img.width / img.height
+        new_width = video_frame_size[0]
+        new_height = int(new_width / aspect_ratio)
+
+        img = img.resize((new_width, new_height), Image.LANCZOS)
+        if new_height < video_frame_size[1]:
+            padding_top = (video_frame_size[1] - new_height) // 2
+            padding_bottom = video_frame_size[1] - new_height - padding_top
+            img = ImageOps.expand(img, border=(
+                0, padding_top, 0, padding_bottom), fill='black')
+
+        img_clip = ImageClip(np.array(img)).set_duration(slide_duration)
+        return img_clip
+    except Exception as e:
+        print(f"Error processing image: {e}")
+        return None
+
+
+def create_image_clips(images_data, video_frame_size, slide_duration):
+    clips = []
+    with ThreadPoolExecutor() as executor:
+        futures = [executor.submit(process_image, img_data, video_frame_size, slide_duration)
+                   for img_data in images_data if img_data is not None]
+        for future in futures:
+            clip = future.result()
+            if clip:
+                clips.append(clip)
+    return clips
+
+
+def calculate_optimal_video_size(images_data, max_width=1920, max_height=1080):
+    average_aspect_ratio = sum(
+        (img.width / img.height for img in images_data if img is not None)) / len(images_data)
+
+    if average_aspect_ratio > 1:
+        width = max_width
+        height = int(width / average_aspect_ratio)
+    else:
+        height = max_height
+        width = int(height * average_aspect_ratio)
+
+    if width > max_width:
+        width = max_width
+        height = int(width / average_aspect_ratio)
+    if height > max_height:
+        height = max_height
+        width = int(height * average_aspect_ratio)
+
+    return width, height
+
+
+def open_images(images_bytes):
+    images_data = []
+    for data in images_bytes:
+        try:
+            images_data.append(Image.open(io.BytesIO(data)) if data else None)
+        except Exception as e:
+            print(f"Error opening image: {e}")
+            images_data.append(None)
+    return images_data
+
+
+def render_slideshow_moviepy(images_bytes, audio_bytes, slideshow_length=3):
+    images_data = open_images(images_bytes)
+    if not images_data or all(img is None for img in images_data):
+        return None, "No images to process."
+
+    audio_clip, tmp_audio_path, error = create_audio_clip(audio_bytes)
+    if error:
+        return None, error
+
+    if not audio_clip:
+        return None, "Audio clip creation failed."
+
+    video_file_path = None
+    try:
+        num_images = len([img for img in images_data if img is not None])
+
+        if num_images == 1:
+            slide_duration = audio_clip.duration
+        else:
+            slide_duration = slideshow_length
+
+        video_frame_size = calculate_optimal_video_size(images_data)
+        processed_clips = create_image_clips(
+            images_data, video_frame_size, slide_duration)
+
+        if num_images == 1:
+            total_video_duration = slide_duration
+            final_clips = processed_clips
+        else:
+            total_video_duration = len(processed_clips) * slide_duration
+            total_loops = math.ceil(total_video_duration /
+                                    (slide_duration * len(images_data)))
+            final_clips = processed_clips * total_loops
+
+        looped_audio_clip = audio_loop(
+            audio_clip, duration=total_video_duration)
+
+        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as tmp_video:
+            video_file_path = tmp_video.name
+        video = concatenate_videoclips(final_clips, method="compose")
+        final_video = video.set_audio(looped_audio_clip)
+        final_video.write_videofile(
+            video_file_path, codec="libx264", audio_codec="aac", fps=24, logger=None)
+        final_video.close()
+
+    except Exception as e:
+        if video_file_path and os.path.exists(video_file_path):
+            os.remove(video_file_path)
+        return None, str(e)
+
+    finally:
+        audio_clip.close()
+        if tmp_audio_path and os.path.exists(tmp_audio_path):
+            try:
+                os.remove(tmp_audio_path)
+            except Exception as e:
+                print(f"Error removing temporary audio file: {e}")
+
+    return video_file_path, None
+
+
+def ffmpeg_binary():
+    if get_ffmpeg_exe is not None:
+        try:
+            return get_ffmpeg_exe()
+        except RuntimeError:
+            pass
+    return "ffmpeg"
+
+
+def prepare_stills(images_data):
+    video_frame_size = calculate_optimal_video_size(images_data)
+    stills = []
+    for img in images_data:
+        if img is None:
+            continue
+        try:
+            aspect_ratio = img.width / img.height
+            new_width = video_frame_size[0]
+            new_height = int(new_width / aspect_ratio)
+            stills.append(img.convert("RGB").resize((new_width, new_height), Image.LANCZOS))
+        except Exception as e:
+            print(f"Error processing image: {e}")
+
+    if not stills:
+        return []
+
+    # Centre every still on one canvas like moviepy's "compose" did, rounded
+    # up to even dimensions for yuv420p.
+    width = max(still.width for still in stills)
+    height = max(still.height for still in stills)
+    width, height = width + width % 2, height + height % 2
+    frames = []
+    for still in stills:
+        frame = Image.new("RGB", (width, height), "black")
+        frame.paste(still, ((width - still.width) // 2, (height - still.height) // 2))
+        frames.append(frame)
+    return frames
+
+
+def render_slideshow_ffmpeg(images_bytes, audio_bytes, slideshow_length=3):
+    images_data = open_images(images_bytes)
+    if not images_data or all(img is None for img in images_data):
+        return None, "No images to process."
+
+    video_file_path = None
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            frames = prepare_stills(images_data)
+            if not frames:
+                return None, "No images to process."
+
+            still_paths = []
+            for index, frame in enumerate(frames):
+                still_path = os.path.join(work_dir, f"{index}.png")
+                frame.save(still_path)
+                still_paths.append(still_path)
+
+            audio_path = os.path.join(work_dir, "audio.mp3")
+            with open(audio_path, "wb") as f:
+                f.write(audio_bytes)
+
+            with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as tmp_video:
+                video_file_path = tmp_video.name
+
+            command = [ffmpeg_binary(), "-y", "-loglevel", "error"]
+            if len(still_paths) == 1:
+                # A single still lasts as long as the audio.
+                command += ["-loop", "1", "-framerate", "24", "-i", still_paths[0],
+                            "-i", audio_path, "-shortest"]
+            else:
+                list_path = os.path.join(work_dir, "slides.txt")
+                with open(list_path, "w") as f:
+                    for still_path in still_paths:
+                        f.write(f"file '{still_path}'\nduration {slideshow_length}\n")
+                    # The concat demuxer ignores the last duration unless the
+                    # final file is listed again.
+                    f.write(f"file '{still_paths[-1]}'\n")
+                command += ["-f", "concat", "-safe", "0", "-i", list_path,
+                            "-stream_loop", "-1", "-i", audio_path,
+                            "-t", str(len(still_paths) * slideshow_length)]
+            command += ["-map", "0:v", "-map", "1:a",
+                        "-c:v", "libx264", "-tune", "stillimage", "-pix_fmt", "yuv420p", "-r", "24",
+                        "-c:a", "aac", "-movflags", "+faststart", video_file_path]
+
+            result = subprocess.run(command, capture_output=True, timeout=FFMPEG_TIMEOUT)
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.decode(errors="replace").strip() or "ffmpeg failed.")
+
+    except Exception as e:
+        if video_file_path and os.path.exists(video_file_path):
+            os.remove(video_file_path)
+        return None, str(e)
+
+    return video_file_path, None
+
+
+SLIDESHOW_ENCODERS = {
+    "moviepy": render_slideshow_moviepy,
+    "ffmpeg": render_slideshow_ffmpeg,
+}
+
+
+def render_slideshow(images_bytes, audio_bytes, slideshow_length=3, encoder="ffmpeg"):
+    return SLIDESHOW_ENCODERS[encoder](images_bytes, audio_bytes, slideshow_length)
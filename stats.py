@@ -0,0 +1,45 @@
+from collections import Counter
+
+
+def uploader_name(added_by):
+    return (added_by or "").split('#')[0]
+
+
+class LibraryStats:
+    def __init__(self):
+        self.color_counts = Counter()
+        self.uploader_counts = Counter()
+
+    async def load(self, pool):
+        async with pool.read() as db:
+            async with db.execute("SELECT LOWER(color), COUNT(*) FROM videos GROUP BY color COLLATE NOCASE") as cursor:
+                color_rows = await cursor.fetchall()
+            async with db.execute("SELECT added_by, COUNT(*) FROM videos GROUP BY added_by") as cursor:
+                uploader_rows = await cursor.fetchall()
+
+        self.color_counts = Counter(dict(color_rows))
+        self.uploader_counts = Counter()
+        for added_by, count in uploader_rows:
+            self.uploader_counts[uploader_name(added_by)] += count
+
+    def add(self, color, added_by):
+        self.color_counts[color.lower()] += 1
+        self.uploader_counts[uploader_name(added_by)] += 1
+
+    def remove(self, color, added_by):
+        self._decrement(self.color_counts, color.lower())
+        self._decrement(self.uploader_counts, uploader_name(added_by))
+
+    def change_color(self, old_color, new_color):
+        self._decrement(self.color_counts, old_color.lower())
+        self.color_counts[new_color.lower()] += 1
+
+    @staticmethod
+    def _decrement(counts, key):
+        counts[key] -= 1
+        if counts[key] <= 0:
+            del counts[key]
+
+    @property
+    def total(self):
+        return sum(self.color_counts.values())
@@ -0,0 +1,30 @@
+from collections import Counter
+
+
+class TagVocabulary:
+    def __init__(self):
+        self.counts = Counter()
+
+    async def load(self, pool):
+        async with pool.read() as db:
+            async with db.execute("SELECT tag, COUNT(*) FROM video_hashtags GROUP BY tag") as cursor:
+                rows = await cursor.fetchall()
+        self.counts = Counter(dict(rows))
+
+    def add(self, tags):
+        self.counts.update(tags)
+
+    def remove(self, tags):
+        for tag in tags:
+            self.counts[tag] -= 1
+            if self.counts[tag] <= 0:
+                del self.counts[tag]
+
+    def tags(self):
+        return list(self.counts)
+
+    def search(self, user_input, limit=25):
+        user_input = user_input.lower()
+        matches = [tag for tag in self.counts if user_input in tag]
+        matches.sort(key=lambda tag: -self.counts[tag])
+        return matches[:limit]
@@ -0,0 +1,133 @@
+import asyncio
+import heapq
+import json
+import time
+from collections import defaultdict
+
+
+class TimerService:
+    def __init__(self, pool, flush_interval=1.0):
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.handlers = {}
+        self.coalesce = {}
+        self.timers = {}
+        self.heap = []
+        self._pending = {}
+        self._flush_task = None
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def register(self, kind, handler, coalesce=0.0):
+        # Handlers take the payloads of every timer of their kind that is due
+        # in the same pass, so they can batch the work themselves. A coalesce
+        # window holds a due timer back that long so later ones can join it.
+        self.handlers[kind] = handler
+        self.coalesce[kind] = coalesce
+
+    async def load(self):
+        async with self.pool.read() as db:
+            async with db.execute("SELECT kind, key, due_at, payload FROM timers") as cursor:
+                rows = await cursor.fetchall()
+        for kind, key, due_at, payload in rows:
+            if (kind, key) not in self.timers:
+                self.timers[(kind, key)] = (due_at, json.loads(payload))
+                self.heap.append((due_at, kind, key))
+        heapq.heapify(self.heap)
+
+    def start(self):
+        # Loading happens here, once every handler has been registered.
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def schedule(self, kind, key, due_at, payload):
+        key = str(key)
+        self.timers[(kind, key)] = (due_at, payload)
+        heapq.heappush(self.heap, (due_at, kind, key))
+        if self.heap[0] == (due_at, kind, key):
+            # New earliest deadline; the loop is sleeping towards a later one.
+            self._wakeup.set()
+        self._queue_write(kind, key, (due_at, payload))
+
+    def cancel(self, kind, key):
+        key = str(key)
+        # The heap entry is left behind and skipped once it surfaces.
+        if self.timers.pop((kind, key), None) is not None:
+            self._queue_write(kind, key, None)
+
+    def _queue_write(self, kind, key, timer):
+        self._pending[(kind, key)] = timer
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        upserts = [(kind, key, timer[0], json.dumps(timer[1]))
+                   for (kind, key), timer in batch.items() if timer is not None]
+        deletes = [(kind, key) for (kind, key), timer in batch.items() if timer is None]
+        try:
+            async with self.pool.write() as db:
+                await db.executemany(
+                    "INSERT OR REPLACE INTO timers (kind, key, due_at, payload) VALUES (?, ?, ?, ?)", upserts)
+                await db.executemany("DELETE FROM timers WHERE kind = ? AND key = ?", deletes)
+        except Exception as e:
+            print(f"Error saving timers: {e}")
+            # Anything written since the snapshot is newer and wins.
+            self._pending = {**batch, **self._pending}
+
+    def pop_due(self, now):
+        due = defaultdict(list)
+        while self.heap and self.heap[0][0] <= now:
+            due_at, kind, key = heapq.heappop(self.heap)
+            timer = self.timers.get((kind, key))
+            if timer is None or timer[0] != due_at:
+                continue
+            if kind not in self.handlers:
+                print(f"No handler registered for {kind} timers; leaving {key} until the next restart.")
+                continue
+            del self.timers[(kind, key)]
+            due[kind].append((key, timer[1]))
+        return due
+
+    async def _run(self):
+        await self.load()
+        while True:
+            self._wakeup.clear()
+            if not self.heap:
+                await self._wakeup.wait()
+                continue
+
+            due_at, kind, _ = self.heap[0]
+            delay = due_at + self.coalesce.get(kind, 0.0) - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            for kind, timers in self.pop_due(time.time()).items():
+                try:
+                    await self.handlers[kind]([payload for _, payload in timers])
+                except Exception as e:
+                    print(f"Error running {kind} timers: {e}")
+                for key, _ in timers:
+                    # A handler may have rescheduled the same key.
+                    if (kind, key) not in self.timers:
+                        self._queue_write(kind, key, None)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import aiohttp
+
+SHORTEN_API_URL = "https://da.gd/shorten"
+
+
+class UrlShortener:
+    def __init__(self, pool, http_session, timeout=10):
+        self.pool = pool
+        self.http_session = http_session
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.inflight = {}
+
+    async def shorten(self, url):
+        async with self.pool.read() as db:
+            async with db.execute("SELECT short_url FROM short_links WHERE url = ?", (url,)) as cursor:
+                row = await cursor.fetchone()
+        if row:
+            return row[0]
+
+        # Concurrent saves of the same link share a single request.
+        task = self.inflight.get(url)
+        if task is None:
+            task = asyncio.create_task(self._shorten(url))
+            self.inflight[url] = task
+            task.add_done_callback(lambda _: self.inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _shorten(self, url):
+        try:
+            async with self.http_session.get(
+                    SHORTEN_API_URL, params={"r": "1", "url": url}, timeout=self.timeout) as response:
+                response.raise_for_status()
+                short_url = (await response.text()).strip()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error shortening URL: {e}")
+            return None
+
+        if not short_url.startswith("http"):
+            print(f"Error shortening URL: unexpected response {short_url!r}")
+            return None
+
+        async with self.pool.write() as db:
+            await db.execute(
+                "INSERT OR REPLACE INTO short_links (url, short_url, created_at) VALUES (?, ?, ?)",
+                (url, short_url, int(time.time())))
+        return short_url
@@ -1,9 +1,20 @@
 import asyncio
 import json
 import os
+import tempfile
+import time
 import aiosqlite
-from database import fisher_yates_shuffle, synchronize_cache_with_database
+from cooldown_index import CooldownIndex
+from database import (
+    FTS_COLUMNS, fisher_yates_shuffle, fts_match_expression, set_video_hashtags, split_hashtags,
+    synchronize_cache_with_database
+)
 from config import MOD_LOG
+from fuzzy_index import FuzzyIndex
+from migrations import run_migrations
+from stats import LibraryStats
+from play_journal import PlayJournal
+from tag_vocabulary import TagVocabulary
 
 COLORS = ["green", "red", "yellow"]
 
@@ -16,11 +27,20 @@ class VideoManager:
         self.last_reset = {}
         self.played_videos = {}
         self.hall_of_fame = []
-        self.db_path = "videos.db"
+        self.db = bot.db
         self.data = {"green": [], "red": [], "yellow": []}
+        self.journal = PlayJournal()
+        self.cooldown_index = CooldownIndex()
+        self.fuzzy_index = FuzzyIndex()
+        self.tag_vocabulary = TagVocabulary()
+        self.stats = LibraryStats()
+        self._compaction_task = None
+        self._snapshot_lock = asyncio.Lock()
+        self._save_requested = False
+        self._save_task = None
 
     async def load_hall_of_fame(self):
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             query = "SELECT * FROM videos WHERE is_hall_of_fame = 1"
             cursor = await db.execute(query)
             results = await cursor.fetchall()
@@ -33,6 +53,8 @@ class VideoManager:
         if video_info:
             for key, value in updates.items():
                 video_info[key] = value
+            if "hashtags" in updates:
+                self.fuzzy_index.invalidate()
 
     async def change_video_color_in_cache(self, video_name, new_color):
         video_name_lower = video_name.lower()
@@ -59,15 +81,23 @@ class VideoManager:
         updated_video_details = {**default_video_details, **details}
 
         self.videos_info[video_name_lower] = updated_video_details
+        self.fuzzy_index.invalidate()
 
     async def remove_video_from_cache(self, video_name):
         if video_name in self.videos_info:
             del self.videos_info[video_name]
+            self.fuzzy_index.invalidate()
 
     async def update_video_hashtags_in_cache(self, video_name, updated_hashtags):
         video_name_lower = video_name.lower()
         if video_name_lower in self.videos_info:
             self.videos_info[video_name_lower]['hashtags'] = updated_hashtags
+            self.fuzzy_index.invalidate()
+
+    def search_video_names(self, user_input, limit=25):
+        if self.fuzzy_index.stale:
+            self.fuzzy_index.rebuild(self.videos_info)
+        return self.fuzzy_index.search(user_input, limit)
 
     # async def print_cached_data(self):
     #     print("Cached Video Data:")
@@ -82,7 +112,7 @@ class VideoManager:
     #         print("----------------------------------------------------")
 
     async def load_videos_info(self):
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             query = """
                 SELECT name, original_url, is_hall_of_fame, hashtags, added_by 
                 FROM videos
@@ -99,6 +129,7 @@ class VideoManager:
                 }
                 for result in results
             }
+            self.fuzzy_index.invalidate()
 
         # # Debug print
         # await self.print_cached_data()
@@ -108,7 +139,8 @@ class VideoManager:
             if not os.path.isfile("video_data.json"):
                 await self.load_videos_info()
                 await self.load_hall_of_fame()
-                self.save_data()
+                self.journal.replay(self.played_videos)
+                await self.write_data()
             else:
                 with open("video_data.json", "r") as f:
                     data = json.load(f)
@@ -116,6 +148,7 @@ class VideoManager:
                     self.last_reset = data.get("last_reset", {})
                     self.played_videos = data.get("played_videos", {})
                     self.hall_of_fame = data.get("hall_of_fame", [])
+                self.journal.replay(self.played_videos)
 
                 for color in COLORS:
                     if color in self.bot.video_lists:
@@ -130,77 +163,106 @@ class VideoManager:
         video_manager = cls(bot)
         await video_manager.initialize_database()
         await video_manager.load_data()
-        await synchronize_cache_with_database()
+        await synchronize_cache_with_database(video_manager.db)
+        await video_manager.tag_vocabulary.load(video_manager.db)
+        await video_manager.stats.load(video_manager.db)
         return video_manager
 
     async def initialize_database(self):
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("PRAGMA table_info(videos)")
-            columns = await cursor.fetchall()
-            if 'hashtags' not in [column[1] for column in columns]:
-                await db.execute("""
-                    ALTER TABLE videos
-                    ADD COLUMN hashtags TEXT
-                """)
-
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS videos (
-                    id INTEGER PRIMARY KEY,
-                    name TEXT,
-                    url TEXT,
-                    color TEXT,
-                    original_url TEXT,
-                    added_by TEXT,
-                    tiktok_author_link TEXT,
-                    tiktok_original_link TEXT,
-                    tiktok_sound_link TEXT,
-                    insta_original_link TEXT,
-                    date_added TEXT,
-                    is_hall_of_fame BOOLEAN DEFAULT 0,
-                    hashtags TEXT
-                )
-            """)
-            await db.commit()
+        await run_migrations(self.db)
+
+    def _snapshot(self):
+        return {
+            "video_lists": {color: list(urls) for color, urls in self.bot.video_lists.items()},
+            "last_reset": dict(self.last_reset),
+            "played_videos": dict(self.played_videos),
+            "hall_of_fame": list(self.hall_of_fame)
+        }
 
-    def save_data(self):
+    def _write_snapshot(self, data):
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath("video_data.json")), prefix="video_data.", suffix=".tmp")
         try:
-            with open("video_data.json", "w") as f:
-                data = {
-                    "video_lists": self.bot.video_lists,
-                    "last_reset": self.last_reset,
-                    "played_videos": self.played_videos,
-                    "hall_of_fame": self.hall_of_fame
-                }
-                json.dump(data, f, indent=4)
-        except Exception as e:
-            print(f"Error saving data to file: {e}")
-            raise e
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, "video_data.json")
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.journal.discard_rotated()
+
+    async def write_data(self):
+        # Every snapshot goes through this lock, so writes land in the order
+        # their snapshots were taken and never share a temp file.
+        async with self._snapshot_lock:
+            data = self._snapshot()
+            try:
+                await self.journal.rotate()
+                await asyncio.to_thread(self._write_snapshot, data)
+            except Exception as e:
+                print(f"Error saving data to file: {e}")
+
+    def save_data(self):
+        # Coalesce bursts of edits into one background write; a change made
+        # while a write is in flight triggers one more.
+        self._save_requested = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._save_pending())
+
+    async def _save_pending(self):
+        while self._save_requested:
+            self._save_requested = False
+            await self.write_data()
+
+    async def compact_data(self):
+        await self.write_data()
+
+    def record_play(self, url, played_at):
+        self.played_videos[url] = played_at
+        self.cooldown_index.mark_played(url, played_at)
+        self.journal.append(url, played_at)
+        if self.journal.needs_compaction and (self._compaction_task is None or self._compaction_task.done()):
+            self._compaction_task = asyncio.create_task(self.compact_data())
+
+    async def close(self):
+        if self._save_task is not None:
+            await self._save_task
+        if self._compaction_task is not None:
+            await self._compaction_task
+        await self.journal.close()
 
     async def remove_video(self, identifier, identifier_type, MOD_LOG, deleted_by):
         removed_url = None
         removed_name = None
         added_by = None
         color_removed_from = None
+        removed_hashtags = None
 
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.write() as db:
             for color in COLORS:
-                query = f"SELECT * FROM videos WHERE {identifier_type} = ? AND color = ?"
+                query = f"SELECT * FROM videos WHERE {identifier_type} = ? AND color = ? COLLATE NOCASE"
                 values = (identifier, color)
                 async with db.execute(query, values) as cursor:
                     result = await cursor.fetchone()
-                    if result:
-                        removed_name = result[1]
-                        removed_url = result[4]
-                        color_removed_from = result[3]
-                        added_by = result[6]
-                        await db.execute(f"DELETE FROM videos WHERE {identifier_type} = ? AND color = ?", (identifier, color))
-                        await db.commit()
-                        break
+                if result:
+                    removed_name = result[1]
+                    removed_url = result[4]
+                    color_removed_from = result[3]
+                    added_by = result[5]
+                    removed_hashtags = result[12]
+                    await db.execute(f"DELETE FROM videos WHERE {identifier_type} = ? AND color = ? COLLATE NOCASE", (identifier, color))
+                    break
 
         if removed_url and removed_name:
             if color_removed_from in self.bot.video_lists and removed_url in self.bot.video_lists[color_removed_from]:
                 self.bot.video_lists[color_removed_from].remove(removed_url)
                 fisher_yates_shuffle(self.bot.video_lists[color_removed_from])
+            self.cooldown_index.remove(removed_url)
+            self.tag_vocabulary.remove(split_hashtags(removed_hashtags))
+            self.stats.remove(color_removed_from, added_by)
 
             self.played_videos.pop(removed_url, None)
 
@@ -223,19 +285,24 @@ class VideoManager:
         return removed_url, removed_name
 
     async def search_videos(self, phrase, identifier_type):
-        matched_videos = []
-        async with aiosqlite.connect(self.db_path) as db:
-            for color in COLORS:
-                query = f"SELECT * FROM videos WHERE {identifier_type} LIKE ? AND color = ?"
-                values = (f"%{phrase}%", color)
-                async with db.execute(query, values) as cursor:
-                    result = await cursor.fetchall()
-                    if result:
-                        matched_videos.extend([video[4] for video in result])
-        return matched_videos
+        column = identifier_type if identifier_type in FTS_COLUMNS else None
+        match = fts_match_expression(phrase, column)
+        if match is None:
+            return []
+
+        query = """
+            SELECT videos.original_url FROM videos_fts
+            JOIN videos ON videos.id = videos_fts.rowid
+            WHERE videos_fts MATCH ? AND videos.color IN (?, ?, ?)
+            ORDER BY rank
+        """
+        async with self.db.read() as db:
+            async with db.execute(query, (match, *COLORS)) as cursor:
+                results = await cursor.fetchall()
+        return [result[0] for result in results]
 
     async def get_video_url(self, name: str):
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             query = "SELECT original_url FROM videos WHERE name = ?"
             values = (name,)
             async with db.execute(query, values) as cursor:
@@ -247,7 +314,7 @@ class VideoManager:
                 return None
 
     async def get_video_color(self, name: str):
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             query = "SELECT color FROM videos WHERE name = ?"
             values = (name,)
             async with db.execute(query, values) as cursor:
@@ -262,11 +329,11 @@ class VideoManager:
         old_color = await self.get_video_color(name)
         url = await self.get_video_url(name)
         if old_color is not None and url is not None:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.db.write() as db:
                 query = "UPDATE videos SET color = ? WHERE name = ?"
                 values = (new_color, name)
                 await db.execute(query, values)
-                await db.commit()
+            self.stats.change_color(old_color, new_color)
 
             if old_color in self.bot.video_lists:
                 if url in self.bot.video_lists[old_color]:
@@ -276,38 +343,47 @@ class VideoManager:
                 self.bot.video_lists[new_color].append(url)
             else:
                 self.bot.video_lists[new_color] = [url]
+            self.cooldown_index.add(
+                new_color, url, self.played_videos.get(url, 0), time.time())
 
             self.save_data()
 
-    async def get_available_videos_with_cooldown(self, colors, current_time, cooldown):
-        available_videos = []
-        for color in colors:
-            if color in self.bot.video_lists:
-                filtered_videos = [video for video in self.bot.video_lists[color]
-                                   if current_time - self.played_videos.get(video, 0) > cooldown]
-                available_videos.extend(filtered_videos)
+    def _sync_cooldown_index(self, current_time, cooldown):
+        cooldown = cooldown or 0
+        # Lowering the cooldown only lets heap entries expire sooner, but
+        # raising it can put ready videos back on cooldown, so rebuild then.
+        if not self.cooldown_index.built or cooldown > self.cooldown_index.cooldown:
+            self.cooldown_index.rebuild(
+                self.bot.video_lists, self.played_videos, current_time, cooldown)
+        else:
+            self.cooldown_index.cooldown = cooldown
 
-        fisher_yates_shuffle(available_videos)
-        return available_videos
+    async def pick_available_video(self, colors, current_time, cooldown):
+        self._sync_cooldown_index(current_time, cooldown)
+        return self.cooldown_index.pick(colors, current_time)
+
+    def cooldown_occupancy(self, current_time, cooldown):
+        self._sync_cooldown_index(current_time, cooldown)
+        return self.cooldown_index.cooling_count(current_time), len(self.cooldown_index.colors)
 
     async def _get_videos_for_color(self, color, current_time, cooldown):
         if not self.bot.video_lists.get(color) or (current_time - self.last_reset.get(color, 0) > 129600):
-            query = "SELECT original_url FROM videos WHERE color = ?"
+            query = "SELECT original_url FROM videos WHERE color = ? COLLATE NOCASE"
             values = (color,)
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with self.db.read() as db:
                 cursor = await db.execute(query, values)
                 results = await cursor.fetchall()
 
             self.bot.video_lists[color] = [
-                url["original_url"] for url in results]
+                url[0] for url in results]
             self.last_reset[color] = current_time
             fisher_yates_shuffle(self.bot.video_lists[color])
+            self.cooldown_index.invalidate()
 
         return [video for video in self.bot.video_lists[color] if current_time - self.played_videos.get(video, 0) > cooldown]
 
     async def update_hall_of_fame(self, identifier: str):
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             query = "SELECT original_url FROM videos WHERE name = ? OR original_url = ?"
             values = (identifier, identifier)
             async with db.execute(query, values) as cursor:
@@ -320,7 +396,7 @@ class VideoManager:
             self.save_data()
 
     async def fetch_video_info(self, url: str):
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             query = """
                 SELECT name, color, added_by, tiktok_author_link, tiktok_original_link,
                     tiktok_sound_link, insta_original_link, date_added, original_url,
@@ -348,7 +424,7 @@ class VideoManager:
         params = (name, original_discord_url,
                   tiktok_original_link, insta_original_link)
         conflict_details = []
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             async with db.execute(query, params) as cursor:
                 rows = await cursor.fetchall()
                 for row in rows:
@@ -365,20 +441,24 @@ class VideoManager:
         return conflict_details
 
     async def add_video_to_database(self, name, url, color, original_url, added_by, tiktok_author_link=None, tiktok_original_link=None, tiktok_sound_link=None, insta_original_link=None, date_added=None, hashtags=None):
-        async with aiosqlite.connect(self.db_path) as db:
-            query = """
-                INSERT INTO videos 
-                (name, url, color, original_url, added_by, tiktok_author_link, tiktok_original_link, tiktok_sound_link, insta_original_link, date_added, hashtags) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            values = (name, url, color, original_url, added_by, tiktok_author_link,
-                      tiktok_original_link, tiktok_sound_link, insta_original_link, date_added, hashtags)
-            try:
-                await db.execute(query, values)
-                await db.commit()
-                if color in self.bot.video_lists and original_url not in self.bot.video_lists[color]:
-                    self.bot.video_lists[color].append(original_url)
-                    fisher_yates_shuffle(self.bot.video_lists[color])
-            except aiosqlite.IntegrityError as e:
-                print(f"Error adding video to the database: {e}")
+        query = """
+            INSERT INTO videos 
+            (name, url, color, original_url, added_by, tiktok_author_link, tiktok_original_link, tiktok_sound_link, insta_original_link, date_added, hashtags) 
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        values = (name, url, color, original_url, added_by, tiktok_author_link,
+                  tiktok_original_link, tiktok_sound_link, insta_original_link, date_added, hashtags)
+        try:
+            async with self.db.write() as db:
+                cursor = await db.execute(query, values)
+                await set_video_hashtags(db, cursor.lastrowid, hashtags)
+            self.tag_vocabulary.add(split_hashtags(hashtags))
+            self.stats.add(color, added_by)
+            if color in self.bot.video_lists and original_url not in self.bot.video_lists[color]:
+                self.bot.video_lists[color].append(original_url)
+                fisher_yates_shuffle(self.bot.video_lists[color])
+                self.cooldown_index.add(
+                    color, original_url, self.played_videos.get(original_url, 0), time.time())
+        except aiosqlite.IntegrityError as e:
+            print(f"Error adding video to the database: {e}")
         self.save_data()